@@ -1,13 +1,18 @@
 """Simplified BLE connection management for CLI tool."""
 
 import asyncio
+import collections
 import logging
-from typing import TYPE_CHECKING
+import platform
+import random
+from typing import TYPE_CHECKING, Iterator
 
-from bleak import BleakClient, BleakScanner
-from bleak.exc import BleakError
-from bleak_retry_connector import establish_connection, BleakClientWithServiceCache, BleakNotFoundError
+from bleak import BleakClient
+from bleak.exc import BleakCharacteristicNotFoundError, BleakDBusError, BleakError
+from bleak_retry_connector import establish_connection, BleakClientWithServiceCache
 
+from . import gatt_cache
+from .discovery import ADVERTISEMENT_MAX_AGE, _SharedScanner
 from .exceptions import BLEConnectionError, BLEProtocolError, BLETimeoutError
 
 if TYPE_CHECKING:
@@ -15,6 +20,83 @@ if TYPE_CHECKING:
 
 _LOGGER = logging.getLogger(__name__)
 
+# Write-without-response commands allowed in flight before waiting for them to complete
+WRITE_PIPELINE_DEPTH = 8
+
+# Unsolicited notifications buffered for stream consumers; older ones are dropped beyond this
+NOTIFICATION_BUFFER_SIZE = 16
+
+# ATT_MTU requested after connecting; 247 lets a 244-byte write fit one LE data packet
+REQUESTED_MTU = 247
+
+# Upper bound on the randomized backoff between connection attempts
+MAX_RETRY_DELAY = 8.0
+
+# Minimum backoff after a connect timeout, giving a busy device time to recover
+TIMEOUT_RETRY_DELAY = 5.0
+
+# BlueZ drops CCCD subscriptions itself when the link goes down, making stop_notify
+# on disconnect a wasted ATT write; other backends still get an explicit unsubscribe
+UNSUBSCRIBE_ON_DISCONNECT = platform.system() != "Linux"
+
+# Upper bound on connection teardown so a stuck D-Bus call can't hang exit
+CLEANUP_TIMEOUT = 2.0
+
+# BlueZ/D-Bus errors that retrying cannot fix (adapter off, missing permissions)
+FATAL_DBUS_ERRORS = frozenset({
+    "org.bluez.Error.NotReady",
+    "org.bluez.Error.NotAuthorized",
+    "org.freedesktop.DBus.Error.AccessDenied",
+})
+
+
+def _backoff_delay(attempt: int, base_delay: float) -> float:
+    """Return a full-jitter exponential backoff delay for a retry attempt."""
+    return random.uniform(0, min(base_delay * (2 ** attempt), MAX_RETRY_DELAY))
+
+
+def _exception_chain(exc: BaseException) -> Iterator[BaseException]:
+    """Yield an exception and the exceptions it was raised from or while handling.
+    
+    bleak_retry_connector re-raises connect failures as its own exception
+    types, so the underlying D-Bus error or timeout is only found down the chain.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def _is_fatal_error(exc: Exception) -> bool:
+    """Check if a connection error cannot be resolved by retrying."""
+    return any(
+        isinstance(e, BleakDBusError) and e.dbus_error in FATAL_DBUS_ERRORS
+        for e in _exception_chain(exc)
+    )
+
+
+def _is_timeout(exc: Exception) -> bool:
+    """Check if a connection error was caused by a timeout."""
+    return any(isinstance(e, asyncio.TimeoutError) for e in _exception_chain(exc))
+
+
+def _is_stale_cache_error(exc: Exception, using_cached_handles: bool, link_up: bool) -> bool:
+    """Check if a connection error means the cached GATT table no longer matches the device.
+    
+    A characteristic lookup that found nothing always counts. Any other BleakError
+    counts only if it came from an operation on a cached handle while the link
+    was still up; a dropped link explains a failure without blaming the cache.
+    
+    Args:
+        exc: Error raised while connecting
+        using_cached_handles: Whether the failing operation used handles from the cache
+        link_up: Whether the device was still connected when the error was raised
+    """
+    if any(isinstance(e, BleakCharacteristicNotFoundError) for e in _exception_chain(exc)):
+        return True
+    return using_cached_handles and link_up and isinstance(exc, BleakError)
+
 
 class BLEConnection:
     """Simplified BLE connection manager for CLI tool."""
@@ -32,37 +114,64 @@ class BLEConnection:
         self.protocol = protocol
         self.client: BleakClient | None = None
         self.write_char = None
-        self._response_queue = asyncio.Queue()
+        self.max_write: int | None = None
+        self._responses = collections.deque(maxlen=NOTIFICATION_BUFFER_SIZE)
+        self._response_event = asyncio.Event()
+        self._pending_response: asyncio.Future | None = None
         self._notification_active = False
+        self._write_pending: set[asyncio.Task] = set()
+    
+    @property
+    def is_connected(self) -> bool:
+        """Whether the link to the device is currently up."""
+        return self.client is not None and self.client.is_connected
     
     async def __aenter__(self):
         """Establish BLE connection and initialize protocol with improved retry logic."""
         max_retries = 6
         base_delay = 1.0
         
+        # Service table from a previous run, used to narrow service discovery
+        cached_services = gatt_cache.load(self.mac_address)
+        cached_service = None
+        if cached_services:
+            cached_service = gatt_cache.find_service_for_characteristic(cached_services, self.service_uuid)
+        
         for attempt in range(max_retries):
+            # Set once operations start going through handles taken from the cache
+            using_cached_handles = False
             try:
                 _LOGGER.debug(f"Connection attempt {attempt + 1}/{max_retries} for {self.mac_address}")
                 
-                # Find device with longer timeout on later attempts
-                scan_timeout = min(60.0 + attempt * 2.0, 60.0)
+                # Find device with longer timeout on later attempts. Eink tags advertise
+                # at most every ~1.28s, so 5s is enough to see one in good conditions
+                scan_timeout = min(5.0 + attempt * 5.0, 20.0)
                 
-                # On retry attempts, do a fresh scan to handle "device disappeared" errors
+                # On retry attempts, require a fresh advertisement to handle "device disappeared" errors
                 if attempt > 0:
                     _LOGGER.debug(f"Performing fresh device scan for {self.mac_address}...")
-                    # Clear any cached device info
                     await asyncio.sleep(0.5)  # Brief pause before scanning
                 
-                device = await BleakScanner.find_device_by_address(self.mac_address, timeout=scan_timeout)
+                # Reuse a recent advertisement from the shared scanner, scanning only on a miss
+                device = await _SharedScanner.instance().get_device(
+                    self.mac_address,
+                    max_age=ADVERTISEMENT_MAX_AGE if attempt == 0 else 0.0,
+                    timeout=scan_timeout,
+                )
                 
                 if not device:
                     if attempt < max_retries - 1:
-                        delay = base_delay * (2 ** attempt)  # Exponential backoff
+                        delay = _backoff_delay(attempt, base_delay)
                         _LOGGER.warning(f"Device {self.mac_address} not found, retrying in {delay:.1f}s...")
                         await asyncio.sleep(delay)
                         continue
                     raise BLEConnectionError(f"Device {self.mac_address} not found after {max_retries} attempts")
                 
+                # Only discover the services we know we need when the table is cached
+                connect_kwargs = {}
+                if cached_service:
+                    connect_kwargs['services'] = [cached_service['uuid']]
+                
                 # Establish connection with retry-specific timeout
                 connection_timeout = min(10.0 + attempt * 5.0, 30.0)
                 self.client = await establish_connection(
@@ -72,13 +181,23 @@ class BLEConnection:
                     self._disconnected_callback,
                     timeout=connection_timeout,
                     max_attempts=2,  # Reduce bleak_retry_connector attempts since we handle retries here
+                    **connect_kwargs,
                 )
                 
                 # Resolve characteristic
-                if not self._resolve_characteristic():
+                cached_handle = None
+                if cached_service:
+                    cached_handle = gatt_cache.characteristic_handle(cached_service, self.service_uuid)
+                if not self._resolve_characteristic(cached_handle):
                     await self.client.disconnect()
+                    if cached_service and attempt < max_retries - 1:
+                        # Cached service table is stale, retry straight away with full discovery
+                        _LOGGER.debug(f"Cached GATT table for {self.mac_address} is stale, rediscovering")
+                        gatt_cache.clear(self.mac_address)
+                        cached_service = None
+                        continue
                     if attempt < max_retries - 1:
-                        delay = base_delay * (2 ** attempt)
+                        delay = _backoff_delay(attempt, base_delay)
                         _LOGGER.warning(f"Could not resolve characteristic, retrying in {delay:.1f}s...")
                         await asyncio.sleep(delay)
                         continue
@@ -86,6 +205,17 @@ class BLEConnection:
                         f"Could not resolve characteristic for service {self.service_uuid}"
                     )
                 
+                # Remember the service table for the next connection. A filtered
+                # discovery only sees part of it, so only full discoveries are saved
+                if not cached_service:
+                    services_snapshot = gatt_cache.snapshot_services(self.client.services)
+                    if services_snapshot != cached_services:
+                        gatt_cache.save(self.mac_address, services_snapshot)
+                        cached_services = services_snapshot
+                
+                using_cached_handles = cached_service is not None
+                await self._negotiate_mtu()
+                
                 # Enable notifications
                 await self.client.start_notify(self.write_char, self._notification_callback)
                 self._notification_active = True
@@ -96,11 +226,26 @@ class BLEConnection:
                 _LOGGER.info(f"Successfully connected to {self.mac_address} on attempt {attempt + 1}")
                 return self
                 
-            except (BleakNotFoundError, BLEConnectionError, asyncio.TimeoutError) as e:
+            except (BleakError, BLEConnectionError, asyncio.TimeoutError) as e:
+                link_up = self.is_connected
                 await self._cleanup()
                 
+                if cached_service and attempt < max_retries - 1 \
+                        and _is_stale_cache_error(e, using_cached_handles, link_up):
+                    # Handles from the cached service table no longer match the device
+                    _LOGGER.debug(f"GATT handle mismatch for {self.mac_address}, rediscovering: {e}")
+                    gatt_cache.clear(self.mac_address)
+                    cached_service = None
+                    continue
+                
+                if _is_fatal_error(e):
+                    _LOGGER.error(f"Unrecoverable error connecting to {self.mac_address}: {e}")
+                    raise BLEConnectionError(f"Failed to connect to {self.mac_address}: {e}")
+                
                 if attempt < max_retries - 1:
-                    delay = base_delay * (2 ** attempt)  # Exponential backoff: 1s, 2s, 4s, 8s, 16s
+                    delay = _backoff_delay(attempt, base_delay)
+                    if _is_timeout(e):
+                        delay = max(delay, TIMEOUT_RETRY_DELAY)
                     _LOGGER.warning(
                         f"Connection attempt {attempt + 1} failed for {self.mac_address}: {e}. "
                         f"Retrying in {delay:.1f}s..."
@@ -122,26 +267,49 @@ class BLEConnection:
     
     async def _cleanup(self):
         """Clean up connection resources."""
+        try:
+            await self.flush()
+        except Exception:
+            pass
+        
         if self.client and self.client.is_connected:
-            if self._notification_active:
-                try:
-                    await self.client.stop_notify(self.write_char)
-                except Exception:
-                    pass
-                finally:
-                    self._notification_active = False
+            # The link is being dropped either way, so teardown order doesn't matter
+            teardown = []
+            if self._notification_active and UNSUBSCRIBE_ON_DISCONNECT:
+                teardown.append(self.client.stop_notify(self.write_char))
+            self._notification_active = False
+            teardown.append(self.client.disconnect())
             try:
-                await self.client.disconnect()
-            except Exception:
-                pass
+                await asyncio.wait_for(
+                    asyncio.gather(*teardown, return_exceptions=True),
+                    timeout=CLEANUP_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                _LOGGER.debug(f"Timed out disconnecting from {self.mac_address}")
     
-    def _resolve_characteristic(self) -> bool:
-        """Resolve BLE characteristic for the protocol-specific service."""
+    def _resolve_characteristic(self, cached_handle: int | None = None) -> bool:
+        """Resolve BLE characteristic for the protocol-specific service.
+        
+        Args:
+            cached_handle: Characteristic handle from the GATT cache; looked up
+                directly by handle and verified against the expected UUID
+                before falling back to a search by UUID
+        """
         try:
             if not self.client or not self.client.services:
                 return False
             
-            char = self.client.services.get_characteristic(self.service_uuid)
+            char = None
+            if cached_handle is not None:
+                char = self.client.services.get_characteristic(cached_handle)
+                if char and char.uuid.lower() == self.service_uuid.lower():
+                    _LOGGER.debug(f"GATT cache hit for {self.service_uuid} (handle {cached_handle})")
+                else:
+                    _LOGGER.debug(f"GATT cache miss for {self.service_uuid} (handle {cached_handle})")
+                    char = None
+            
+            if char is None:
+                char = self.client.services.get_characteristic(self.service_uuid)
             if char:
                 self.write_char = char
                 _LOGGER.debug(f"Resolved characteristic for service {self.service_uuid}")
@@ -154,40 +322,144 @@ class BLEConnection:
             _LOGGER.error(f"Error resolving characteristic: {e}")
             return False
     
-    def _notification_callback(self, sender, data: bytearray) -> None:
-        """Handle notification from device."""
+    async def _negotiate_mtu(self) -> None:
+        """Request a larger ATT MTU and record the usable write payload size.
+        
+        Sets max_write to the negotiated MTU minus the 3-byte ATT header, or
+        leaves it as None if the MTU could not be determined.
+        """
         try:
-            self._response_queue.put_nowait(bytes(data))
-        except asyncio.QueueFull:
-            _LOGGER.warning(f"Response queue full for {self.mac_address}")
+            backend = getattr(self.client, "_backend", None)
+            if hasattr(backend, "_acquire_mtu"):
+                # BlueZ negotiates on connect but only reports the MTU once acquired
+                await backend._acquire_mtu()
+            elif hasattr(self.client, "exchange_mtu"):
+                await self.client.exchange_mtu(REQUESTED_MTU)
+            
+            self.max_write = self.client.mtu_size - 3
+            _LOGGER.debug(f"ATT MTU for {self.mac_address}: {self.client.mtu_size} (max write {self.max_write})")
+        except Exception as e:
+            self.max_write = None
+            _LOGGER.debug(f"Could not negotiate MTU for {self.mac_address}: {e}")
     
-    async def write_command_with_response(self, command: bytes, timeout: float = 10.0) -> bytes:
-        """Write command and wait for response."""
-        # Clear pending responses
-        while not self._response_queue.empty():
-            try:
-                self._response_queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
+    def _notification_callback(self, sender, data: bytearray) -> None:
+        """Handle notification from device.
         
-        await self._write_raw(command)
+        A notification answers the outstanding write_command_with_response()
+        call if there is one; otherwise it is queued for stream consumers such
+        as multi-chunk config reads and the image uploader.
+        
+        bleak hands each callback a freshly allocated bytearray, so it is
+        passed on as-is rather than copied.
+        """
+        fut = self._pending_response
+        if fut is not None and not fut.done():
+            fut.set_result(data)
+        else:
+            # The deque is bounded: a full buffer drops its oldest entry, since
+            # the newest notification is the one a reader is most likely waiting for
+            if len(self._responses) == self._responses.maxlen:
+                _LOGGER.debug(f"Notification buffer full for {self.mac_address}, dropping oldest")
+            self._responses.append(data)
+            self._response_event.set()
+    
+    async def write_command_with_response(self, command: bytes, timeout: float = 10.0) -> bytes | bytearray:
+        """Write command and wait for response."""
+        # Drop stale unsolicited notifications so follow-up reads only see this exchange
+        self._responses.clear()
         
+        # Register for the response before writing so a fast reply is not missed
+        self._pending_response = asyncio.get_running_loop().create_future()
         try:
-            response = await asyncio.wait_for(self._response_queue.get(), timeout=timeout)
-            return response
+            await self._write_raw(command)
+            await self.flush()
+            return await asyncio.wait_for(self._pending_response, timeout=timeout)
         except asyncio.TimeoutError:
             raise BLETimeoutError(f"No response from {self.mac_address} within {timeout}s")
+        finally:
+            self._pending_response = None
+    
+    async def read_notification(self, timeout: float = 10.0) -> bytes | bytearray:
+        """Wait for the next notification not claimed by write_command_with_response().
+        
+        Args:
+            timeout: Timeout in seconds
+            
+        Pipelined writes are flushed first, so a failed write is reported as
+        itself rather than as a missing response.
+        
+        Returns:
+            Notification payload
+            
+        Raises:
+            asyncio.TimeoutError: If no notification arrives in time
+            Exception: The first error raised by a pending write
+        """
+        await self.flush()
+        while not self._responses:
+            self._response_event.clear()
+            await asyncio.wait_for(self._response_event.wait(), timeout=timeout)
+        return self._responses.popleft()
+    
+    async def stop_notifications(self) -> None:
+        """Unsubscribe from protocol notifications while keeping the link up."""
+        if self.client and self._notification_active:
+            self._notification_active = False
+            try:
+                await self.client.stop_notify(self.write_char)
+            except Exception as e:
+                _LOGGER.debug(f"Error stopping notifications for {self.mac_address}: {e}")
     
     async def write_command(self, data: bytes) -> None:
         """Write command without expecting response."""
         await self._write_raw(data)
     
+    async def flush(self) -> None:
+        """Wait for all pipelined writes to complete.
+        
+        Raises:
+            Exception: The first error raised by a pending write
+        """
+        if not self._write_pending:
+            return
+        
+        pending, self._write_pending = self._write_pending, set()
+        try:
+            await asyncio.gather(*pending)
+        except Exception:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise
+    
     async def _write_raw(self, data: bytes) -> None:
-        """Write raw data to device characteristic."""
+        """Write raw data to device characteristic.
+        
+        Writes are pipelined: each one is started immediately but only awaited
+        once WRITE_PIPELINE_DEPTH are in flight or flush() is called, so bulk
+        transfers are not serialized on a D-Bus round-trip per packet.
+        """
         if not self.write_char:
             raise BLEProtocolError("Write characteristic not available")
         
-        await self.client.write_gatt_char(self.write_char, data, response=False)
+        # Surface failures from earlier writes as soon as they are known
+        for task in [t for t in self._write_pending if t.done()]:
+            self._write_pending.discard(task)
+            if task.cancelled():
+                await self.flush()
+                raise BLEConnectionError(f"Write to {self.mac_address} was cancelled")
+            exc = task.exception()
+            if exc is not None:
+                await self.flush()
+                raise exc
+        
+        task = asyncio.ensure_future(
+            self.client.write_gatt_char(self.write_char, data, response=False)
+        )
+        self._write_pending.add(task)
+        
+        if len(self._write_pending) >= WRITE_PIPELINE_DEPTH:
+            await self.flush()
     
     def _disconnected_callback(self, client: BleakClient) -> None:
         """Handle disconnection event."""
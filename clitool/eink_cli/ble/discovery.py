@@ -2,10 +2,13 @@
 
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
 from bleak import BleakScanner
 from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
 
 from .exceptions import BLEError
 
@@ -17,12 +20,201 @@ KNOWN_MANUFACTURER_IDS = {
     0x2446: 'oepl',  # OEPL firmware (9286 decimal)
 }
 
+# Matched against each advertisement's manufacturer IDs in a single set operation
+_KNOWN_MFG_SET = frozenset(KNOWN_MANUFACTURER_IDS)
 
-async def discover_devices(timeout: float = 10.0) -> List[Dict[str, Any]]:
+# Advertisements seen more recently than this are trusted for connecting without a rescan
+ADVERTISEMENT_MAX_AGE = 5.0
+
+
+class _SharedScanner:
+    """Process-wide BLE scanner that remembers the latest advertisement per device.
+
+    Discovery and connection setup both need to see a device advertise before
+    they can use it. Routing them through one scanner lets a connect reuse an
+    advertisement that was already received instead of starting another scan.
+    Cached advertisements outlive the scanner itself, so the radio only scans
+    while somebody is inside ``scanning()``.
+    """
+
+    _instance: Optional["_SharedScanner"] = None
+
+    def __init__(self):
+        """Initialize shared scanner state."""
+        self._scanner: Optional[BleakScanner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._users = 0
+        self._seen: Dict[str, Tuple[BLEDevice, AdvertisementData, float]] = {}
+        self._last_prune = time.monotonic()
+        self._waiters: Dict[str, List[asyncio.Event]] = {}
+        self._listeners: List[Callable[[BLEDevice, AdvertisementData], None]] = []
+
+    @classmethod
+    def instance(cls) -> "_SharedScanner":
+        """Return the process-wide scanner instance."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _detection_callback(self, device: BLEDevice, adv_data: AdvertisementData) -> None:
+        """Record an advertisement and wake anyone waiting for this device."""
+        address = device.address.upper()
+        now = time.monotonic()
+        self._seen[address] = (device, adv_data, now)
+        for waiter in self._waiters.get(address, ()):
+            waiter.set()
+        for listener in self._listeners:
+            listener(device, adv_data)
+
+        # Devices with rotating random addresses would otherwise grow the cache without
+        # bound in long-running processes; nobody trusts advertisements older than this
+        if now - self._last_prune >= ADVERTISEMENT_MAX_AGE:
+            self._last_prune = now
+            self._seen = {
+                address: entry for address, entry in self._seen.items()
+                if now - entry[2] <= ADVERTISEMENT_MAX_AGE
+            }
+
+    @contextmanager
+    def listening(self, callback: Callable[[BLEDevice, AdvertisementData], None]):
+        """Call a function for every advertisement received inside the block."""
+        self._listeners.append(callback)
+        try:
+            yield
+        finally:
+            self._listeners.remove(callback)
+
+    @asynccontextmanager
+    async def scanning(self):
+        """Keep the radio scanning for the duration of the block.
+
+        Nested and concurrent users share a single underlying ``BleakScanner``;
+        it is stopped once the last user leaves.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A scanner bound to a previous (now closed) event loop is unusable
+            self._scanner = None
+            self._users = 0
+            self._lock = asyncio.Lock()
+            self._loop = loop
+
+        # Starting and stopping await the adapter, so users arriving meanwhile
+        # must wait for the outcome rather than start scanners of their own
+        async with self._lock:
+            if self._users == 0:
+                _LOGGER.debug("Starting shared BLE scanner")
+                scanner = BleakScanner(
+                    detection_callback=self._detection_callback,
+                    scanning_mode="active",
+                )
+                await scanner.start()
+                self._scanner = scanner
+            self._users += 1
+
+        try:
+            yield self
+        finally:
+            async with self._lock:
+                self._users -= 1
+                if self._users == 0 and self._scanner is not None:
+                    scanner, self._scanner = self._scanner, None
+                    _LOGGER.debug("Stopping shared BLE scanner")
+                    try:
+                        await scanner.stop()
+                    except Exception as e:
+                        _LOGGER.debug(f"Error stopping shared BLE scanner: {e}")
+
+    def get_cached(
+        self, mac_address: str, max_age: Optional[float] = None
+    ) -> Optional[Tuple[BLEDevice, AdvertisementData]]:
+        """Return the last advertisement seen for a device.
+
+        Args:
+            mac_address: Device MAC address
+            max_age: Maximum age in seconds, or None to accept any age still
+                cached (entries are dropped after about ADVERTISEMENT_MAX_AGE)
+
+        Returns:
+            Tuple of (device, advertisement data) or None if not cached/stale
+        """
+        entry = self._seen.get(mac_address.upper())
+        if entry is None:
+            return None
+        device, adv_data, last_seen = entry
+        if max_age is not None and time.monotonic() - last_seen > max_age:
+            return None
+        return device, adv_data
+
+    async def get_advertisement(
+        self, mac_address: str, max_age: float = ADVERTISEMENT_MAX_AGE, timeout: float = 10.0
+    ) -> Optional[Tuple[BLEDevice, AdvertisementData]]:
+        """Get a device's advertisement, scanning only if the cache is stale.
+
+        The scan stops as soon as the device is seen rather than running for
+        the full timeout.
+
+        Args:
+            mac_address: Device MAC address
+            max_age: Maximum age in seconds of a cached advertisement
+            timeout: Scan timeout in seconds on cache miss
+
+        Returns:
+            Tuple of (device, advertisement data), or None if the device did
+            not advertise in time
+        """
+        mac_address = mac_address.upper()
+        cached = self.get_cached(mac_address, max_age)
+        if cached:
+            _LOGGER.debug(f"Using cached advertisement for {mac_address}")
+            return cached
+
+        waiter = asyncio.Event()
+        self._waiters.setdefault(mac_address, []).append(waiter)
+        try:
+            async with self.scanning():
+                await asyncio.wait_for(waiter.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters[mac_address]
+            waiters.remove(waiter)
+            if not waiters:
+                del self._waiters[mac_address]
+
+        return self.get_cached(mac_address)
+
+    async def get_device(
+        self, mac_address: str, max_age: float = ADVERTISEMENT_MAX_AGE, timeout: float = 10.0
+    ) -> Optional[BLEDevice]:
+        """Get a connectable BLE device, scanning only if the cache is stale.
+
+        Args:
+            mac_address: Device MAC address
+            max_age: Maximum age in seconds of a cached advertisement
+            timeout: Scan timeout in seconds on cache miss
+
+        Returns:
+            BLEDevice if seen, None if the device did not advertise in time
+        """
+        advertisement = await self.get_advertisement(mac_address, max_age, timeout)
+        return advertisement[0] if advertisement else None
+
+
+async def discover_devices(
+    timeout: float = 10.0,
+    stop_when: Optional[Callable[[Dict[str, Any]], bool]] = None
+) -> List[Dict[str, Any]]:
     """Discover BLE eink devices.
     
+    Advertisements are parsed as they arrive, so the scan can end early once
+    ``stop_when`` is satisfied.
+    
     Args:
         timeout: Discovery timeout in seconds
+        stop_when: Optional predicate called with each newly parsed device;
+            discovery stops as soon as it returns True
         
     Returns:
         List of discovered device information dictionaries
@@ -32,16 +224,29 @@ async def discover_devices(timeout: float = 10.0) -> List[Dict[str, Any]]:
     """
     _LOGGER.info(f"Starting BLE discovery (timeout: {timeout}s)")
     
+    found: Dict[str, Dict[str, Any]] = {}
+    done = asyncio.Event()
+    
+    def on_advertisement(device: BLEDevice, adv_data: AdvertisementData) -> None:
+        device_info = _parse_device(device, adv_data)
+        if not device_info:
+            return
+        if device_info['mac_address'] not in found:
+            _LOGGER.debug(f"Found eink device: {device_info}")
+        found[device_info['mac_address']] = device_info
+        if stop_when and stop_when(device_info):
+            done.set()
+    
     try:
-        devices = await BleakScanner.discover(timeout=timeout, return_adv=True)
-        eink_devices = []
-        
-        for device_address, (device, adv_data) in devices.items():
-            device_info = _parse_device(device, adv_data)
-            if device_info:
-                eink_devices.append(device_info)
-                _LOGGER.debug(f"Found eink device: {device_info}")
+        scanner = _SharedScanner.instance()
+        with scanner.listening(on_advertisement):
+            async with scanner.scanning():
+                try:
+                    await asyncio.wait_for(done.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
         
+        eink_devices = list(found.values())
         _LOGGER.info(f"Discovery completed, found {len(eink_devices)} eink devices")
         return eink_devices
         
@@ -62,19 +267,21 @@ def _parse_device(device: BLEDevice, adv_data) -> Optional[Dict[str, Any]]:
     # Check manufacturer data for known eink device IDs
     manufacturer_data = adv_data.manufacturer_data
     
-    for mfg_id, protocol in KNOWN_MANUFACTURER_IDS.items():
-        if mfg_id in manufacturer_data:
-            return {
-                'mac_address': device.address.upper(),
-                'name': device.name or f"EInk Device ({protocol.upper()})",
-                'protocol': protocol,
-                'manufacturer_id': mfg_id,
-                'rssi': adv_data.rssi,
-                'device': device,
-                'adv_data': manufacturer_data[mfg_id]
-            }
+    matches = _KNOWN_MFG_SET.intersection(manufacturer_data)
+    if not matches:
+        return None
     
-    return None
+    mfg_id = next(iter(matches))
+    protocol = KNOWN_MANUFACTURER_IDS[mfg_id]
+    return {
+        'mac_address': device.address.upper(),
+        'name': device.name or f"EInk Device ({protocol.upper()})",
+        'protocol': protocol,
+        'manufacturer_id': mfg_id,
+        'rssi': adv_data.rssi,
+        'device': device,
+        'adv_data': manufacturer_data[mfg_id]
+    }
 
 
 async def find_device_by_mac(mac_address: str, timeout: float = 10.0) -> Optional[Dict[str, Any]]:
@@ -90,12 +297,25 @@ async def find_device_by_mac(mac_address: str, timeout: float = 10.0) -> Optiona
     mac_address = mac_address.upper()
     _LOGGER.debug(f"Searching for device {mac_address}")
     
-    devices = await discover_devices(timeout)
+    scanner = _SharedScanner.instance()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    max_age = ADVERTISEMENT_MAX_AGE
     
-    for device in devices:
-        if device['mac_address'] == mac_address:
+    # Return on first sight instead of scanning for the full timeout; the
+    # advertisement stays cached for the connection that usually follows
+    while (remaining := deadline - loop.time()) > 0:
+        advertisement = await scanner.get_advertisement(mac_address, max_age=max_age, timeout=remaining)
+        if advertisement is None:
+            break
+        
+        device = _parse_device(*advertisement)
+        if device:
             _LOGGER.debug(f"Found target device: {device}")
             return device
+        
+        # Seen without eink manufacturer data yet; wait for a newer advertisement
+        max_age = 0.0
     
     _LOGGER.warning(f"Device {mac_address} not found")
     return None
\ No newline at end of file
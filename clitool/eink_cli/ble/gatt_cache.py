@@ -0,0 +1,142 @@
+"""Disk-backed cache of device GATT service tables.
+
+Each CLI invocation is a fresh process, so bleak's in-memory service cache is
+lost between runs. This module persists a snapshot of a device's services and
+characteristics keyed by MAC address so later connections know up front which
+service holds the protocol characteristic.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+CACHE_DIR = Path.home() / ".cache" / "eink_cli" / "gatt"
+
+
+def _cache_file(mac_address: str) -> Path:
+    """Return the cache file path for a device."""
+    return CACHE_DIR / f"{mac_address.upper().replace(':', '').replace('-', '')}.json"
+
+
+def snapshot_services(services) -> List[Dict[str, Any]]:
+    """Serialize a bleak service collection into a JSON-friendly snapshot.
+
+    Args:
+        services: BleakGATTServiceCollection from a connected client
+
+    Returns:
+        List of service dictionaries with their characteristics
+    """
+    return [
+        {
+            'uuid': service.uuid,
+            'handle': service.handle,
+            'characteristics': [
+                {
+                    'uuid': char.uuid,
+                    'handle': char.handle,
+                    'properties': list(char.properties),
+                }
+                for char in service.characteristics
+            ],
+        }
+        for service in services
+    ]
+
+
+def find_service_for_characteristic(
+    snapshot: List[Dict[str, Any]], char_uuid: str
+) -> Optional[Dict[str, Any]]:
+    """Find the service in a snapshot that contains a characteristic.
+
+    Args:
+        snapshot: Snapshot as returned by load()
+        char_uuid: Characteristic UUID to look for
+
+    Returns:
+        Service dictionary, or None if the characteristic is not present
+    """
+    char_uuid = char_uuid.lower()
+    for service in snapshot:
+        for char in service['characteristics']:
+            if char['uuid'].lower() == char_uuid:
+                return service
+    return None
+
+
+def characteristic_handle(service: Dict[str, Any], char_uuid: str) -> Optional[int]:
+    """Get the cached handle of a characteristic within a service.
+
+    Args:
+        service: Service dictionary from a snapshot
+        char_uuid: Characteristic UUID
+
+    Returns:
+        Characteristic handle, or None if not present
+    """
+    char_uuid = char_uuid.lower()
+    for char in service['characteristics']:
+        if char['uuid'].lower() == char_uuid:
+            return char['handle']
+    return None
+
+
+def load(mac_address: str) -> Optional[List[Dict[str, Any]]]:
+    """Load the cached service snapshot for a device.
+
+    Args:
+        mac_address: Device MAC address
+
+    Returns:
+        Service snapshot, or None if nothing usable is cached
+    """
+    try:
+        with open(_cache_file(mac_address), 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        _LOGGER.debug(f"Ignoring unreadable GATT cache for {mac_address}: {e}")
+        return None
+
+    if not isinstance(snapshot, list):
+        return None
+    return snapshot
+
+
+def save(mac_address: str, snapshot: List[Dict[str, Any]]) -> None:
+    """Persist a service snapshot for a device.
+
+    Failures are logged and otherwise ignored; the cache is only an optimization.
+
+    Args:
+        mac_address: Device MAC address
+        snapshot: Snapshot as returned by snapshot_services()
+    """
+    path = _cache_file(mac_address)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        tmp_path.replace(path)
+    except OSError as e:
+        _LOGGER.debug(f"Could not write GATT cache for {mac_address}: {e}")
+
+
+def clear(mac_address: str) -> None:
+    """Remove the cached service snapshot for a device.
+
+    Args:
+        mac_address: Device MAC address
+    """
+    try:
+        _cache_file(mac_address).unlink()
+        _LOGGER.debug(f"Cleared GATT cache for {mac_address}")
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        _LOGGER.debug(f"Could not clear GATT cache for {mac_address}: {e}")
@@ -571,7 +571,7 @@ class BLEImageUploader:
         """Upload image using block-based protocol.
 
         Args:
-            image_data: JPEG image data
+            image_data: Encoded image data (any format PIL can open)
             metadata: Device metadata with dimensions and color support
             protocol_type: Protocol type ("atc" or "oepl")
             dither: 0=none, 1=ordered, 2=floyd-steinberg
@@ -580,7 +580,7 @@ class BLEImageUploader:
             bool: True if upload succeeded, False otherwise
         """
         try:
-            # Convert JPEG to PIL Image
+            # Decode image data to PIL Image
             image = Image.open(io.BytesIO(image_data))
             _LOGGER.debug("Before transpose: image size %dx%d", image.width, image.height)
 
@@ -662,9 +662,7 @@ class BLEImageUploader:
             bytes: Response data or None if timeout
         """
         try:
-            response = await asyncio.wait_for(
-                self.connection._response_queue.get(), timeout=timeout
-            )
+            response = await self.connection.read_notification(timeout=timeout)
 
             # Basic validation only
             if not response or len(response) < 2:
@@ -738,7 +736,7 @@ class BLEImageUploader:
         """Upload image using direct write protocol (OEPL only).
         
         Args:
-            image_data: JPEG image data
+            image_data: Encoded image data (any format PIL can open)
             metadata: Device metadata with dimensions and color scheme
             compressed: Whether to compress the data
             dither: 0=none, 1=ordered, 2=floyd-steinberg
@@ -751,7 +749,7 @@ class BLEImageUploader:
         self._upload_error = None
         
         try:
-            # Convert JPEG to PIL Image
+            # Decode image data to PIL Image
             image = Image.open(io.BytesIO(image_data))
             _LOGGER.debug("Direct write: image size %dx%d", image.width, image.height)
 
@@ -792,8 +790,11 @@ class BLEImageUploader:
             self._direct_write_compressed = compressed
             self._direct_write_uncompressed_size = uncompressed_size
             
-            # Split into chunks (max 230 bytes per chunk)
+            # Split into chunks (max 230 bytes per chunk, less if the MTU is smaller)
             chunk_size = BLE_MAX_PACKET_DATA_SIZE
+            max_write = getattr(self.connection, "max_write", None)
+            if max_write:
+                chunk_size = min(chunk_size, max_write - 2)  # 2-byte command prefix
             for i in range(0, len(data_to_send), chunk_size):
                 chunk = data_to_send[i:i + chunk_size]
                 self._direct_write_chunks.append(chunk)
@@ -804,7 +805,7 @@ class BLEImageUploader:
             if compressed:
                 # Compressed: send 4-byte header + initial data if it fits
                 header = struct.pack("<I", uncompressed_size)
-                max_start_payload = 200  # Leave room for command bytes
+                max_start_payload = min(200, chunk_size)  # Leave room for command bytes
                 
                 if len(header) + len(data_to_send) <= max_start_payload:
                     # Small payload - send everything in start command
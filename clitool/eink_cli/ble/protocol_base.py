@@ -112,6 +112,8 @@ class BLEProtocol(ABC):
 
         Called after BLE connection is established and notifications are enabled.
         Protocols can override this to send initialization commands if needed.
+        The negotiated write payload size is available as ``connection.max_write``
+        (None if the MTU could not be determined).
 
         Args:
             connection: Active BLE connection
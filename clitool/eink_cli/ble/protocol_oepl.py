@@ -268,9 +268,7 @@ class OEPLProtocol(BLEProtocol):
 
             try:
                 # Read next chunk from queue (firmware sends them automatically)
-                next_response = await asyncio.wait_for(
-                    connection._response_queue.get(), timeout=2.0
-                )
+                next_response = await connection.read_notification(timeout=2.0)
             except asyncio.TimeoutError:
                 _LOGGER.warning(
                     "Timeout waiting for chunk %d (have %d of %d bytes)",
@@ -8,10 +8,13 @@ from pathlib import Path
 
 import click
 
-from .config import load_config
-from .device import DeviceManager
-from .imagegen import ImageGenerator
-from .ble import get_protocol_by_manufacturer_id
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _display_params(device_info: dict) -> tuple:
+    """Return the device info fields that affect image generation."""
+    return device_info['width'], device_info['height'], device_info['color_scheme']
 
 
 # Configure logging
@@ -42,6 +45,9 @@ def discover(ctx, timeout):
     verbose = ctx.obj['verbose']
     
     async def _discover():
+        from .ble import get_protocol_by_manufacturer_id
+        from .device import DeviceManager
+        
         device_manager = DeviceManager()
         devices = await device_manager.discover_devices(timeout=timeout)
         
@@ -94,7 +100,33 @@ def send(ctx, config_file, device, protocol, timeout, retries, ttl):
     verbose = ctx.obj['verbose']
     
     async def _send():
+        from contextlib import AsyncExitStack
+        from .daemon import forward_request
+        
         try:
+            # Hand off to a running daemon, which may already hold a connection to the device
+            response = await forward_request({
+                'command': 'send',
+                'config_file': str(Path(config_file).resolve()),
+                'device': device,
+                'protocol': protocol,
+                'timeout': timeout,
+                'retries': retries,
+                'ttl': ttl
+            })
+            if response is not None:
+                if not response.get('ok'):
+                    click.echo(f"✗ Daemon failed to send image: {response.get('error')}", err=True)
+                    sys.exit(1)
+                device_info = response['device']
+                click.echo(f"Sent via daemon to {device_info['name']} ({device_info['protocol']})")
+                click.echo("✓ Image sent successfully!")
+                return
+            
+            from .config import load_config
+            from .device import DeviceManager
+            from .imagegen import ImageGenerator
+            
             # Load configuration
             config = load_config(config_file)
             
@@ -115,23 +147,46 @@ def send(ctx, config_file, device, protocol, timeout, retries, ttl):
             
             # Initialize device manager and connect
             device_manager = DeviceManager()
-            device_info = await device_manager.connect_device(
-                mac_address, 
-                protocol=device_protocol if device_protocol != 'auto' else None,
-                timeout=timeout
-            )
-            
-            click.echo(f"Connected to {device_info['name']} ({device_info['protocol']})")
-            click.echo(f"Display: {device_info['width']}x{device_info['height']} pixels")
-            
-            # Generate image
-            click.echo("Generating image...")
             image_gen = ImageGenerator()
-            image_data = await image_gen.generate_image(config, device_info)
             
-            # Upload image
-            click.echo(f"Uploading image (max {retries} retries)...")
-            success = await device_manager.upload_image(image_data, device_info, max_retries=retries, ttl_seconds=ttl)
+            async with AsyncExitStack() as stack:
+                # Keep the connection open from interrogation through upload
+                connect_task = asyncio.create_task(stack.enter_async_context(device_manager.open_device(
+                    mac_address, 
+                    protocol=device_protocol if device_protocol != 'auto' else None,
+                    timeout=timeout
+                )))
+                
+                # Render with the display parameters from the last connection while connecting
+                cached_info = device_manager.get_cached_device_info(mac_address)
+                generate_task = None
+                if cached_info:
+                    generate_task = asyncio.create_task(image_gen.generate_image(config, cached_info))
+                
+                try:
+                    device_info = await connect_task
+                except Exception:
+                    if generate_task:
+                        generate_task.cancel()
+                    raise
+                
+                click.echo(f"Connected to {device_info['name']} ({device_info['protocol']})")
+                click.echo(f"Display: {device_info['width']}x{device_info['height']} pixels")
+                
+                # Generate image
+                click.echo("Generating image...")
+                image_data = None
+                if generate_task:
+                    image_data = await generate_task
+                    if _display_params(cached_info) != _display_params(device_info):
+                        _LOGGER.debug("Cached display parameters are stale, regenerating image")
+                        image_data = None
+                if image_data is None:
+                    image_data = await image_gen.generate_image(config, device_info)
+                
+                # Upload image
+                click.echo(f"Uploading image (max {retries} retries)...")
+                success = await device_manager.upload_image(image_data, device_info, max_retries=retries, ttl_seconds=ttl)
             
             if success:
                 click.echo("✓ Image sent successfully!")
@@ -178,15 +233,30 @@ def ping(ctx, mac_address, protocol, timeout):
     verbose = ctx.obj['verbose']
     
     async def _ping():
+        from .daemon import forward_request
+        
         try:
             click.echo(f"Pinging device {mac_address}...")
             
-            device_manager = DeviceManager()
-            device_info = await device_manager.connect_device(
-                mac_address, 
-                protocol=protocol,
-                timeout=timeout
-            )
+            response = await forward_request({
+                'command': 'ping',
+                'mac_address': mac_address,
+                'protocol': protocol,
+                'timeout': timeout
+            })
+            if response is None:
+                from .device import DeviceManager
+                
+                device_manager = DeviceManager()
+                device_info = await device_manager.connect_device(
+                    mac_address, 
+                    protocol=protocol,
+                    timeout=timeout
+                )
+            elif response.get('ok'):
+                device_info = response['device']
+            else:
+                raise RuntimeError(response.get('error'))
             
             click.echo(f"✓ Device responded: {device_info['name']} ({device_info['protocol']})")
             click.echo(f"  Display: {device_info['width']}x{device_info['height']} pixels")
@@ -218,6 +288,9 @@ def generate(ctx, config_file, output, format, width, height):
     verbose = ctx.obj['verbose']
     
     async def _generate():
+        from .config import load_config
+        from .imagegen import ImageGenerator
+        
         try:
             # Load configuration
             config = load_config(config_file)
@@ -236,12 +309,15 @@ def generate(ctx, config_file, output, format, width, height):
             image_gen = ImageGenerator()
             image_data = await image_gen.generate_image(config, device_info)
             
-            # Save image
-            from PIL import Image
-            import io
-            
-            image = Image.open(io.BytesIO(image_data))
-            image.save(output, format=format)
+            # Save image; generated images are already PNG, so only JPEG needs re-encoding
+            if format == 'PNG':
+                Path(output).write_bytes(image_data)
+            else:
+                from PIL import Image
+                import io
+                
+                image = Image.open(io.BytesIO(image_data))
+                image.save(output, format=format)
             
             click.echo(f"✓ Image saved to {output}")
             
@@ -259,6 +335,136 @@ def generate(ctx, config_file, output, format, width, height):
         sys.exit(1)
 
 
+@cli.command()
+@click.argument('batch_file', type=click.Path(exists=True, path_type=Path))
+@click.option('--concurrency', '-c', default=4, type=click.IntRange(min=1), help='Maximum number of devices handled at once')
+@click.option('--timeout', '-t', default=30, help='Connection timeout in seconds')
+@click.option('--retries', '-r', default=3, help='Number of upload retry attempts')
+@click.pass_context
+def batch(ctx, batch_file, concurrency, timeout, retries):
+    """Send to or ping several devices listed in a YAML batch file.
+    
+    All entries run in one process and share a single BLE scanner, with up
+    to --concurrency devices handled at the same time.
+    """
+    verbose = ctx.obj['verbose']
+    
+    async def _batch():
+        from .config import load_batch, load_config
+        from .device import DeviceManager
+        from .imagegen import ImageGenerator
+        
+        entries = load_batch(batch_file)
+        device_manager = DeviceManager()
+        image_gen = ImageGenerator()
+        # The OS BLE stack serializes connection setup, so higher limits only queue up there
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def _run_one(entry):
+            async with semaphore:
+                if entry['action'] == 'ping':
+                    device_info = await device_manager.connect_device(
+                        entry['mac'],
+                        protocol=entry.get('protocol'),
+                        timeout=timeout
+                    )
+                    return (
+                        f"{device_info['name']} ({device_info['protocol']}), "
+                        f"{device_info['width']}x{device_info['height']} {device_info['color_scheme']}"
+                    )
+                
+                config = load_config(entry['config'])
+                if 'mac' in entry:
+                    config['device']['mac_address'] = entry['mac']
+                if 'protocol' in entry:
+                    config['device']['protocol'] = entry['protocol']
+                if 'mac_address' not in config['device']:
+                    raise ValueError("Device MAC address is required")
+                
+                device_protocol = config['device'].get('protocol', 'auto')
+                async with device_manager.open_device(
+                    config['device']['mac_address'],
+                    protocol=device_protocol if device_protocol != 'auto' else None,
+                    timeout=timeout
+                ) as device_info:
+                    image_data = await image_gen.generate_image(config, device_info)
+                    success = await device_manager.upload_image(
+                        image_data,
+                        device_info,
+                        max_retries=retries,
+                        ttl_seconds=entry.get('ttl', 0)
+                    )
+                if not success:
+                    raise RuntimeError("Image upload failed")
+                return "image sent"
+        
+        click.echo(f"Running {len(entries)} batch operation(s)...")
+        results = await asyncio.gather(*(_run_one(entry) for entry in entries), return_exceptions=True)
+        
+        failures = 0
+        for entry, result in zip(entries, results):
+            target = entry.get('mac') or entry['config']
+            if isinstance(result, BaseException):
+                failures += 1
+                click.echo(f"✗ {entry['action']} {target}: {result}", err=True)
+            else:
+                click.echo(f"✓ {entry['action']} {target}: {result}")
+        return failures
+    
+    try:
+        failures = asyncio.run(_batch())
+    except KeyboardInterrupt:
+        click.echo("\nBatch cancelled.")
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        if verbose:
+            import traceback
+            traceback.print_exc()
+        sys.exit(1)
+    
+    if failures:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--idle-timeout', default=300, help='Close device connections unused for this many seconds')
+@click.option('--stdio', is_flag=True, help='Read JSON requests from stdin instead of the socket')
+@click.pass_context
+def daemon(ctx, idle_timeout, stdio):
+    """Run a background daemon that keeps device connections open.
+    
+    While it runs, send and ping hand their work to the daemon so repeated
+    commands for the same device skip scanning and connecting. With --stdio,
+    requests come one JSON object per line on stdin and responses go to
+    stdout, for programs that run the daemon as a child process.
+    """
+    verbose = ctx.obj['verbose']
+    
+    async def _daemon():
+        from .daemon import EinkDaemon
+        
+        if stdio:
+            # stdout carries responses only
+            click.echo("Starting daemon on stdin/stdout...", err=True)
+            await EinkDaemon(idle_timeout=idle_timeout).run_stdio()
+            return
+        
+        click.echo("Starting daemon (Ctrl+C to stop)...")
+        await EinkDaemon(idle_timeout=idle_timeout).run()
+    
+    try:
+        asyncio.run(_daemon())
+    except KeyboardInterrupt:
+        click.echo("\nDaemon stopped.")
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        if verbose:
+            import traceback
+            traceback.print_exc()
+        sys.exit(1)
+
+
 def main():
     """Main entry point."""
     cli()
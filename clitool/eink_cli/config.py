@@ -1,9 +1,49 @@
 """Configuration file parser for YAML input."""
 
+import copy
 import yaml
 from pathlib import Path
 from typing import Dict, Any, List
 
+# libyaml's C loader is much faster; fall back to the pure-Python one without it
+_YAMLLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Validated configs keyed by (path, inode, mtime, ctime, size), oldest evicted first
+_CONFIG_CACHE: Dict[tuple, Dict[str, Any]] = {}
+_CONFIG_CACHE_SIZE = 16
+
+_NUMBER = (int, float)
+_TYPE_NAMES = {str: 'a string', _NUMBER: 'a number'}
+
+# Content element types: required fields with their types, defaults for any field
+# left out, range checks, and coordinates normalized to whole pixels
+_ELEMENT_SCHEMAS = {
+    'text': {
+        'label': 'Text',
+        'required': {'text': str, 'x': _NUMBER, 'y': _NUMBER},
+        'defaults': {'font_size': 16, 'color': 'black', 'anchor': 'top_left'},
+        'non_negative': (),
+        'positive': ('font_size',),
+        'pixels': ('x', 'y'),
+    },
+    'rectangle': {
+        'label': 'Rectangle',
+        'required': {'x': _NUMBER, 'y': _NUMBER, 'width': _NUMBER, 'height': _NUMBER},
+        'defaults': {'color': 'black', 'filled': True},
+        'non_negative': ('x', 'y', 'width', 'height'),
+        'positive': (),
+        'pixels': ('x', 'y', 'width', 'height'),
+    },
+    'line': {
+        'label': 'Line',
+        'required': {'x1': _NUMBER, 'y1': _NUMBER, 'x2': _NUMBER, 'y2': _NUMBER},
+        'defaults': {'color': 'black', 'width': 1},
+        'non_negative': (),
+        'positive': ('width',),
+        'pixels': ('x1', 'y1', 'x2', 'y2'),
+    },
+}
+
 
 class ConfigError(Exception):
     """Configuration validation error."""
@@ -22,9 +62,26 @@ def load_config(config_file: Path) -> Dict[str, Any]:
     Raises:
         ConfigError: If configuration is invalid
     """
+    config_path = Path(config_file)
+    try:
+        stat = config_path.stat()
+    except FileNotFoundError:
+        raise ConfigError(f"Configuration file not found: {config_file}")
+    except OSError as e:
+        raise ConfigError(f"Error reading configuration file: {e}")
+    
+    # Reuse the parsed config while the file is unchanged; callers get their own copy to modify.
+    # The inode and ctime catch a file replaced by rename with its mtime preserved
+    cache_key = (
+        str(config_path.resolve()), stat.st_ino, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size
+    )
+    cached = _CONFIG_CACHE.get(cache_key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+    
     try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.load(f, Loader=_YAMLLoader)
     except yaml.YAMLError as e:
         raise ConfigError(f"Invalid YAML syntax: {e}")
     except FileNotFoundError:
@@ -38,9 +95,61 @@ def load_config(config_file: Path) -> Dict[str, Any]:
     # Validate and set defaults
     config = _validate_config(config)
     
+    if len(_CONFIG_CACHE) >= _CONFIG_CACHE_SIZE:
+        del _CONFIG_CACHE[next(iter(_CONFIG_CACHE))]
+    _CONFIG_CACHE[cache_key] = copy.deepcopy(config)
+    
     return config
 
 
+def load_batch(batch_file: Path) -> List[Dict[str, Any]]:
+    """Load and validate a YAML batch file.
+    
+    The file holds a list of operations, each with an 'action' of 'send' or
+    'ping', the device 'mac' and, for 'send', the 'config' file to render.
+    Relative config paths are resolved against the batch file's directory.
+    
+    Args:
+        batch_file: Path to YAML batch file
+        
+    Returns:
+        List of validated batch entries
+        
+    Raises:
+        ConfigError: If the batch file is invalid
+    """
+    try:
+        with open(batch_file, 'r', encoding='utf-8') as f:
+            entries = yaml.load(f, Loader=_YAMLLoader)
+    except yaml.YAMLError as e:
+        raise ConfigError(f"Invalid YAML syntax: {e}")
+    except FileNotFoundError:
+        raise ConfigError(f"Batch file not found: {batch_file}")
+    except Exception as e:
+        raise ConfigError(f"Error reading batch file: {e}")
+    
+    if not isinstance(entries, list):
+        raise ConfigError("Batch file must be a YAML list")
+    
+    base_dir = Path(batch_file).parent
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ConfigError(f"Batch entry {i} must be a dictionary")
+        
+        action = entry.get('action')
+        if action not in ('send', 'ping'):
+            raise ConfigError(f"Batch entry {i} has invalid action '{action}', must be 'send' or 'ping'")
+        
+        if action == 'send':
+            if 'config' not in entry:
+                raise ConfigError(f"Batch entry {i} requires 'config' for action 'send'")
+            entry['config'] = base_dir / entry['config']
+        elif 'mac' not in entry:
+            raise ConfigError(f"Batch entry {i} requires 'mac' for action 'ping'")
+    
+    return entries
+
+
 def _validate_config(config: Dict[str, Any]) -> Dict[str, Any]:
     """Validate configuration structure and set defaults.
     
@@ -65,9 +174,16 @@ def _validate_config(config: Dict[str, Any]) -> Dict[str, Any]:
     if 'mac_address' not in device:
         raise ConfigError("Device MAC address is required")
     
-    # Validate MAC address format
+    # Validate MAC address format: AA:BB:CC:DD:EE:FF or AA-BB-CC-DD-EE-FF
     mac = device['mac_address'].upper()
-    if not _is_valid_mac(mac):
+    separator = mac[2:3]
+    if len(mac) != 17 or separator not in (':', '-') or mac[2::3] != separator * 5:
+        raise ConfigError(f"Invalid MAC address format: {device['mac_address']}")
+    try:
+        # Rejects non-hex digits; the length check catches stray separators and whitespace
+        if len(bytes.fromhex(mac.replace(separator, ''))) != 6:
+            raise ValueError
+    except ValueError:
         raise ConfigError(f"Invalid MAC address format: {device['mac_address']}")
     device['mac_address'] = mac
     
@@ -127,92 +243,48 @@ def _validate_element(element: Dict[str, Any]) -> None:
     element_type = element['type']
     
     # Validate based on element type
-    if element_type == 'text':
-        _validate_text_element(element)
-    elif element_type == 'rectangle':
-        _validate_rectangle_element(element)
-    elif element_type == 'line':
-        _validate_line_element(element)
-    else:
+    schema = _ELEMENT_SCHEMAS.get(element_type)
+    if schema is None:
         raise ConfigError(f"Unknown element type: {element_type}")
+    _validate_fields(element, schema)
 
 
-def _validate_text_element(element: Dict[str, Any]) -> None:
-    """Validate text element."""
-    required_fields = ['text', 'x', 'y']
-    for field in required_fields:
-        if field not in element:
-            raise ConfigError(f"Text element missing required field: {field}")
-    
-    # Set defaults
-    element.setdefault('font_size', 16)
-    element.setdefault('color', 'black')
-    element.setdefault('anchor', 'top_left')
-    
-    # Validate types
-    if not isinstance(element['text'], str):
-        raise ConfigError("Text field must be a string")
-    
-    if not isinstance(element['x'], (int, float)):
-        raise ConfigError("X coordinate must be a number")
+def _validate_fields(element: Dict[str, Any], schema: Dict[str, Any]) -> None:
+    """Validate a content element against its type's schema and apply defaults.
     
-    if not isinstance(element['y'], (int, float)):
-        raise ConfigError("Y coordinate must be a number")
+    Args:
+        element: Content element dictionary
+        schema: Entry from _ELEMENT_SCHEMAS
+        
+    Raises:
+        ConfigError: If element is invalid
+    """
+    label = schema['label']
+    required = schema['required']
     
-    if not isinstance(element['font_size'], (int, float)) or element['font_size'] <= 0:
-        raise ConfigError("Font size must be a positive number")
-
-
-def _validate_rectangle_element(element: Dict[str, Any]) -> None:
-    """Validate rectangle element."""
-    required_fields = ['x', 'y', 'width', 'height']
-    for field in required_fields:
-        if field not in element:
-            raise ConfigError(f"Rectangle element missing required field: {field}")
+    missing = next((field for field in required if field not in element), None)
+    if missing:
+        raise ConfigError(f"{label} element missing required field: {missing}")
     
     # Set defaults
-    element.setdefault('color', 'black')
-    element.setdefault('filled', True)
+    element.update({key: value for key, value in schema['defaults'].items() if key not in element})
     
     # Validate types
-    for field in required_fields:
-        if not isinstance(element[field], (int, float)) or element[field] < 0:
-            raise ConfigError(f"Rectangle {field} must be a non-negative number")
-
-
-def _validate_line_element(element: Dict[str, Any]) -> None:
-    """Validate line element."""
-    required_fields = ['x1', 'y1', 'x2', 'y2']
-    for field in required_fields:
-        if field not in element:
-            raise ConfigError(f"Line element missing required field: {field}")
-    
-    # Set defaults
-    element.setdefault('color', 'black')
-    element.setdefault('width', 1)
+    for field, expected in required.items():
+        if not isinstance(element[field], expected):
+            raise ConfigError(f"{label} {field} must be {_TYPE_NAMES[expected]}")
     
-    # Validate types
-    for field in required_fields:
-        if not isinstance(element[field], (int, float)):
-            raise ConfigError(f"Line {field} must be a number")
+    for field in schema['non_negative']:
+        if element[field] < 0:
+            raise ConfigError(f"{label} {field} must be a non-negative number")
     
-    if not isinstance(element['width'], (int, float)) or element['width'] <= 0:
-        raise ConfigError("Line width must be a positive number")
-
-
-def _is_valid_mac(mac: str) -> bool:
-    """Check if MAC address format is valid.
+    for field in schema['positive']:
+        if not isinstance(element[field], _NUMBER) or element[field] <= 0:
+            raise ConfigError(f"{label} {field} must be a positive number")
     
-    Args:
-        mac: MAC address string
-        
-    Returns:
-        True if valid MAC address format
-    """
-    import re
-    # Accept formats: AA:BB:CC:DD:EE:FF or AA-BB-CC-DD-EE-FF
-    pattern = r'^([0-9A-F]{2}[:-]){5}([0-9A-F]{2})$'
-    return bool(re.match(pattern, mac))
+    # Normalize to whole pixels once rather than at every draw
+    for field in schema['pixels']:
+        element[field] = int(element[field])
 
 
 def create_example_config() -> Dict[str, Any]:
@@ -0,0 +1,388 @@
+"""Background daemon that keeps device connections open between CLI invocations.
+
+Every CLI command runs in a fresh process and pays for scanning, connecting,
+MTU exchange and service discovery before it can talk to a device. The daemon
+holds those connections in a pool keyed by MAC address, so repeated ``send``
+and ``ping`` commands for the same device reuse an open link. CLI commands
+talk to the daemon over a Unix domain socket using one JSON object per line.
+The same requests can instead be written to the daemon's stdin when another
+program runs it as a child process.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import stat
+import sys
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional
+
+if TYPE_CHECKING:
+    from .device import DeviceManager
+
+_LOGGER = logging.getLogger(__name__)
+
+SOCKET_PATH = Path.home() / ".cache" / "eink_cli" / "daemon.sock"
+
+# Default time a pooled connection may sit unused before it is closed
+DEFAULT_IDLE_TIMEOUT = 300.0
+
+# Connection attempts BLEConnection may make, each scanning and connecting up to the timeout
+CONNECT_ATTEMPTS = 6
+
+# Allowance for one upload attempt, generous enough for slow block-based ATC transfers
+UPLOAD_ATTEMPT_TIME = 120.0
+
+# Extra time allowed for rendering and the socket round-trip
+RESPONSE_GRACE = 30.0
+
+# Fields each command cannot run without
+REQUIRED_FIELDS = {
+    'ping': ('mac_address',),
+    'send': ('config_file',),
+}
+
+
+class ConnectionPool:
+    """Open device connections keyed by MAC address."""
+
+    def __init__(self, device_manager: "DeviceManager", idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        """Initialize connection pool.
+
+        Args:
+            device_manager: Device manager used to open connections
+            idle_timeout: Seconds a connection may stay unused before it is closed
+        """
+        self.device_manager = device_manager
+        self.idle_timeout = idle_timeout
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def lock(self, mac_address: str) -> asyncio.Lock:
+        """Return the lock serializing operations on one device."""
+        return self._locks.setdefault(mac_address.upper(), asyncio.Lock())
+
+    async def acquire(
+        self,
+        mac_address: str,
+        protocol: Optional[str] = None,
+        timeout: float = 30.0
+    ) -> Dict[str, Any]:
+        """Get device information with an open connection, connecting if needed.
+
+        Callers should hold lock(mac_address) while using the connection.
+
+        Args:
+            mac_address: Device MAC address
+            protocol: Protocol name ('oepl' or 'atc'), auto-detected if None
+            timeout: Connection timeout in seconds
+
+        Returns:
+            Device information dictionary from DeviceManager.open_device()
+        """
+        mac_address = mac_address.upper()
+        entry = self._entries.get(mac_address)
+        if entry is not None:
+            device_info = entry['device_info']
+            if device_info['connection'].is_connected and (not protocol or protocol == device_info['protocol']):
+                _LOGGER.debug(f"Reusing pooled connection to {mac_address}")
+                entry['last_used'] = time.monotonic()
+                return device_info
+            await self.release(mac_address)
+
+        stack = AsyncExitStack()
+        try:
+            device_info = await stack.enter_async_context(
+                self.device_manager.open_device(mac_address, protocol=protocol, timeout=timeout)
+            )
+        except BaseException:
+            await stack.aclose()
+            raise
+
+        self._entries[mac_address] = {
+            'stack': stack,
+            'device_info': device_info,
+            'last_used': time.monotonic(),
+        }
+        _LOGGER.info(f"Pooled connection to {mac_address}")
+        return device_info
+
+    async def release(self, mac_address: str) -> None:
+        """Close and forget the pooled connection to a device, if any.
+
+        Args:
+            mac_address: Device MAC address
+        """
+        entry = self._entries.pop(mac_address.upper(), None)
+        if entry is None:
+            return
+        _LOGGER.info(f"Closing pooled connection to {mac_address}")
+        try:
+            await entry['stack'].aclose()
+        except Exception as e:
+            _LOGGER.debug(f"Error closing pooled connection to {mac_address}: {e}")
+
+    async def close_idle(self) -> None:
+        """Close connections that have not been used within the idle timeout."""
+        now = time.monotonic()
+        for mac_address, entry in list(self._entries.items()):
+            if now - entry['last_used'] < self.idle_timeout:
+                continue
+            lock = self.lock(mac_address)
+            if lock.locked():
+                continue
+            async with lock:
+                await self.release(mac_address)
+
+    async def close_all(self) -> None:
+        """Close every pooled connection."""
+        for mac_address in list(self._entries):
+            await self.release(mac_address)
+
+
+def _describe(device_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the JSON-safe subset of device information sent to clients."""
+    return {
+        'mac_address': device_info['mac_address'],
+        'name': device_info['name'],
+        'protocol': device_info['protocol'],
+        'width': device_info['width'],
+        'height': device_info['height'],
+        'color_scheme': device_info['color_scheme'],
+    }
+
+
+class EinkDaemon:
+    """Serves CLI requests over a Unix socket using a connection pool."""
+
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, socket_path: Path = SOCKET_PATH):
+        """Initialize daemon.
+
+        Args:
+            idle_timeout: Seconds a pooled connection may stay unused
+            socket_path: Path of the Unix socket to listen on
+        """
+        from .device import DeviceManager
+
+        self.socket_path = socket_path
+        self.pool = ConnectionPool(DeviceManager(), idle_timeout=idle_timeout)
+
+    async def run(self) -> None:
+        """Serve requests until cancelled."""
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            if await forward_request({'command': 'status'}, self.socket_path) is not None:
+                raise RuntimeError(f"Daemon already running on {self.socket_path}")
+            # Left behind by a daemon that did not shut down cleanly
+            self.socket_path.unlink()
+
+        server = await asyncio.start_unix_server(self._handle_client, path=str(self.socket_path))
+        reaper = asyncio.create_task(self._reap_idle())
+        _LOGGER.info(f"Daemon listening on {self.socket_path}")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reaper.cancel()
+            await self.pool.close_all()
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    async def run_stdio(self) -> None:
+        """Serve requests read from stdin until it is closed.
+
+        Each line of stdin is one JSON request; each response is written to
+        stdout as one line of JSON, in request order.
+        """
+        read_line = await _stdin_line_reader()
+        reaper = asyncio.create_task(self._reap_idle())
+        _LOGGER.info("Daemon reading requests from stdin")
+
+        try:
+            while line := await read_line():
+                if not line.strip():
+                    continue
+                response = await self._respond(line)
+                sys.stdout.write(json.dumps(response) + "\n")
+                sys.stdout.flush()
+        finally:
+            reaper.cancel()
+            await self.pool.close_all()
+
+    async def _reap_idle(self) -> None:
+        """Periodically close idle pooled connections."""
+        interval = max(1.0, min(self.pool.idle_timeout / 2, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            await self.pool.close_idle()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Handle a single request from a CLI process."""
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            response = await self._respond(line)
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _respond(self, line: bytes) -> Dict[str, Any]:
+        """Decode and handle one request line, reporting failures in the response."""
+        try:
+            return await self.handle_request(json.loads(line))
+        except Exception as e:
+            _LOGGER.error(f"Daemon request failed: {e}")
+            return {'ok': False, 'error': str(e)}
+
+    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch a decoded request.
+
+        Args:
+            request: Request dictionary with a 'command' key
+
+        Returns:
+            Response dictionary with an 'ok' key
+        """
+        command = request.get('command')
+        for field in REQUIRED_FIELDS.get(command, ()):
+            if not isinstance(request.get(field), str) or not request[field]:
+                raise ValueError(f"{command} requires {field}")
+        if command == 'status':
+            return {'ok': True}
+        if command == 'ping':
+            return await self._ping(request)
+        if command == 'send':
+            return await self._send(request)
+        raise ValueError(f"Unknown daemon command: {command}")
+
+    async def _ping(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Connect to a device, or confirm a pooled connection is still up."""
+        mac_address = request['mac_address'].upper()
+        async with self.pool.lock(mac_address):
+            device_info = await self.pool.acquire(
+                mac_address, protocol=request.get('protocol'), timeout=request.get('timeout', 10.0)
+            )
+            return {'ok': True, 'device': _describe(device_info)}
+
+    async def _send(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Render a configuration and upload it over a pooled connection."""
+        from .config import load_config
+        from .imagegen import ImageGenerator
+
+        config = load_config(request['config_file'])
+        if request.get('device'):
+            config['device']['mac_address'] = request['device']
+        if request.get('protocol'):
+            config['device']['protocol'] = request['protocol']
+        if 'mac_address' not in config['device']:
+            raise ValueError("Device MAC address is required")
+
+        mac_address = config['device']['mac_address'].upper()
+        device_protocol = config['device'].get('protocol', 'auto')
+
+        async with self.pool.lock(mac_address):
+            device_info = await self.pool.acquire(
+                mac_address,
+                protocol=device_protocol if device_protocol != 'auto' else None,
+                timeout=request.get('timeout', 30.0)
+            )
+            image_data = await ImageGenerator().generate_image(config, device_info)
+            try:
+                success = await self.pool.device_manager.upload_image(
+                    image_data,
+                    device_info,
+                    max_retries=request.get('retries', 3),
+                    ttl_seconds=request.get('ttl', 0)
+                )
+            except BaseException:
+                await self.pool.release(mac_address)
+                raise
+
+            if not success:
+                # Don't hand a connection in an unknown state to the next request
+                await self.pool.release(mac_address)
+                return {'ok': False, 'device': _describe(device_info), 'error': "Image upload failed"}
+
+            return {'ok': True, 'device': _describe(device_info)}
+
+
+async def _stdin_line_reader() -> Callable[[], Awaitable[bytes]]:
+    """Return a coroutine function that reads the next line of stdin.
+
+    Pipes, sockets and terminals are read through the event loop. The loop
+    cannot watch regular files or /dev/null, but reading those never blocks
+    for long, so they are read in a worker thread instead.
+    """
+    mode = os.fstat(sys.stdin.fileno()).st_mode
+    if stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode) or sys.stdin.isatty():
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        return reader.readline
+    return functools.partial(asyncio.to_thread, sys.stdin.buffer.readline)
+
+
+def _response_timeout(request: Dict[str, Any]) -> float:
+    """Return how long to wait for the daemon to answer a request.
+
+    The bound only has to catch a daemon that has stopped responding, so it
+    covers every connection attempt and, for 'send', every upload attempt.
+    """
+    bound = CONNECT_ATTEMPTS * (request.get('timeout') or 30.0) + RESPONSE_GRACE
+    if request.get('command') == 'send':
+        bound += (request.get('retries') or 3) * UPLOAD_ATTEMPT_TIME
+    return bound
+
+
+async def _exchange(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: Dict[str, Any]) -> bytes:
+    """Write one request line and read the response line."""
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    return await reader.readline()
+
+
+async def forward_request(request: Dict[str, Any], socket_path: Path = SOCKET_PATH) -> Optional[Dict[str, Any]]:
+    """Send a request to a running daemon.
+
+    Args:
+        request: Request dictionary with a 'command' key
+        socket_path: Path of the daemon's Unix socket
+
+    Returns:
+        Response dictionary, or None if no daemon is listening. A daemon that
+        fails mid-request, stops answering or answers garbage produces a
+        response with 'ok' False and an 'error' message.
+    """
+    if not hasattr(asyncio, 'open_unix_connection') or not socket_path.exists():
+        return None
+
+    try:
+        reader, writer = await asyncio.open_unix_connection(str(socket_path))
+    except OSError:
+        return None
+
+    timeout = _response_timeout(request)
+    try:
+        line = await asyncio.wait_for(_exchange(reader, writer, request), timeout=timeout)
+    except asyncio.TimeoutError:
+        return {'ok': False, 'error': f"Daemon did not respond within {timeout:.0f}s"}
+    except OSError as e:
+        return {'ok': False, 'error': f"Lost connection to daemon: {e}"}
+    finally:
+        writer.close()
+
+    if not line:
+        return {'ok': False, 'error': "Daemon closed the connection"}
+    try:
+        return json.loads(line)
+    except ValueError:
+        return {'ok': False, 'error': f"Invalid response from daemon: {line[:80]!r}"}
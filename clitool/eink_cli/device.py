@@ -1,7 +1,10 @@
 """Device management for eink displays."""
 
 import asyncio
+import json
 import logging
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
+from pathlib import Path
 from typing import Dict, Any, List, Optional
 
 from .ble import discover_devices, find_device_by_mac, BLEConnection, get_protocol_by_name
@@ -9,6 +12,12 @@ from .ble.exceptions import BLEError, BLEConnectionError, UnsupportedProtocolErr
 
 _LOGGER = logging.getLogger(__name__)
 
+# Last known display parameters per device, so rendering can start before connecting
+DEVICE_CACHE_DIR = Path.home() / ".cache" / "eink_cli" / "devices"
+
+# Device info fields persisted between runs
+_CACHED_DEVICE_FIELDS = ('mac_address', 'protocol', 'name', 'width', 'height', 'color_scheme')
+
 
 class DeviceManager:
     """Manages BLE eink device connections and operations."""
@@ -28,6 +37,33 @@ class DeviceManager:
         """
         return await discover_devices(timeout)
     
+    def get_cached_device_info(self, mac_address: str) -> Optional[Dict[str, Any]]:
+        """Get display parameters recorded the last time a device was connected.
+        
+        Args:
+            mac_address: Device MAC address
+            
+        Returns:
+            Device information subset (dimensions, color scheme, protocol),
+            or None if the device has not been seen before
+        """
+        cache_file = DEVICE_CACHE_DIR / f"{mac_address.upper().replace(':', '')}.json"
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _save_device_info(self, device_info: Dict[str, Any]) -> None:
+        """Record display parameters for get_cached_device_info()."""
+        cache_file = DEVICE_CACHE_DIR / f"{device_info['mac_address'].replace(':', '')}.json"
+        try:
+            DEVICE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump({field: device_info[field] for field in _CACHED_DEVICE_FIELDS}, f)
+        except OSError as e:
+            _LOGGER.debug("Could not cache device info for %s: %s", device_info['mac_address'], e)
+    
     async def connect_device(
         self, 
         mac_address: str, 
@@ -44,12 +80,36 @@ class DeviceManager:
         Returns:
             Device information dictionary with capabilities
             
+        Raises:
+            BLEConnectionError: If connection fails
+            UnsupportedProtocolError: If protocol is not supported
+        """
+        async with self.open_device(mac_address, protocol, timeout) as device_info:
+            return device_info
+    
+    @asynccontextmanager
+    async def open_device(
+        self,
+        mac_address: str,
+        protocol: Optional[str] = None,
+        timeout: float = 30.0
+    ):
+        """Connect to a device and keep the connection open for the duration of the block.
+        
+        Args:
+            mac_address: Device MAC address
+            protocol: Protocol name ('oepl' or 'atc'), auto-detected if None
+            timeout: Connection timeout in seconds
+            
+        Yields:
+            Device information dictionary; its 'connection' stays open inside the block
+            
         Raises:
             BLEConnectionError: If connection fails
             UnsupportedProtocolError: If protocol is not supported
         """
         mac_address = mac_address.upper()
-        _LOGGER.info(f"Connecting to device {mac_address}")
+        _LOGGER.info("Connecting to device %s", mac_address)
         
         # Find device if protocol not specified
         if not protocol:
@@ -57,7 +117,7 @@ class DeviceManager:
             if not device_info:
                 raise BLEConnectionError(f"Device {mac_address} not found during discovery")
             protocol = device_info['protocol']
-            _LOGGER.info(f"Auto-detected protocol: {protocol}")
+            _LOGGER.info("Auto-detected protocol: %s", protocol)
         
         # Get protocol handler
         try:
@@ -72,40 +132,51 @@ class DeviceManager:
             protocol=protocol_handler
         )
         
-        try:
-            # Connect and interrogate device
-            async with connection:
-                _LOGGER.info(f"Connected to {mac_address}, interrogating device...")
+        async with AsyncExitStack() as stack:
+            try:
+                # Connect and interrogate device
+                await stack.enter_async_context(connection)
+                _LOGGER.info("Connected to %s, interrogating device...", mac_address)
                 capabilities = await protocol_handler.interrogate_device(connection)
-                
-                device_info = {
-                    'mac_address': mac_address,
-                    'protocol': protocol,
-                    'name': f"EInk Device ({protocol.upper()})",
-                    'width': capabilities.width,
-                    'height': capabilities.height,
-                    'color_scheme': capabilities.color_scheme,
-                    'connection': connection,
-                    'protocol_handler': protocol_handler,
-                    'capabilities': capabilities
-                }
-                
-                _LOGGER.info(
-                    f"Device {mac_address}: {capabilities.width}x{capabilities.height}, "
-                    f"color_scheme={capabilities.color_scheme}"
-                )
-                
-                return device_info
-                
-        except Exception as e:
-            raise BLEConnectionError(f"Failed to connect to {mac_address}: {e}")
+            except Exception as e:
+                raise BLEConnectionError(f"Failed to connect to {mac_address}: {e}")
+            
+            device_info = {
+                'mac_address': mac_address,
+                'protocol': protocol,
+                'name': f"EInk Device ({protocol.upper()})",
+                'width': capabilities.width,
+                'height': capabilities.height,
+                'color_scheme': capabilities.color_scheme,
+                'connection': connection,
+                'protocol_handler': protocol_handler,
+                'capabilities': capabilities
+            }
+            
+            _LOGGER.info(
+                "Device %s: %dx%d, color_scheme=%s",
+                mac_address, capabilities.width, capabilities.height, capabilities.color_scheme
+            )
+            
+            self._save_device_info(device_info)
+            
+            yield device_info
     
-    async def upload_image(self, image_data: bytes, device_info: Dict[str, Any], max_retries: int = 3, ttl_seconds: int = 0) -> bool:
+    async def upload_image(
+        self,
+        image_data: bytes,
+        device_info: Dict[str, Any],
+        max_retries: int = 3,
+        ttl_seconds: int = 0
+    ) -> bool:
         """Upload image to device with retry mechanism.
         
+        Uploads over device_info['connection'] while it is still open, as it
+        is inside open_device(); otherwise each attempt makes a new connection.
+        
         Args:
-            image_data: JPEG image data
-            device_info: Device information from connect_device()
+            image_data: Encoded image data from ImageGenerator
+            device_info: Device information from connect_device() or open_device()
             
         Returns:
             True if upload succeeded, False otherwise
@@ -114,37 +185,44 @@ class DeviceManager:
         protocol = device_info['protocol']
         protocol_handler = device_info['protocol_handler']
         capabilities = device_info['capabilities']
+        connection = device_info['connection']
         
-        _LOGGER.info(f"Uploading image to {mac_address} ({len(image_data)} bytes)")
+        _LOGGER.info("Uploading image to %s (%d bytes)", mac_address, len(image_data))
+        
+        # Imported here so discovery and ping don't load the image stack
+        from .ble.metadata import BLEDeviceMetadata
+        from .ble.image_upload import BLEImageUploader
+        
+        # Create metadata object for upload
+        metadata = BLEDeviceMetadata({
+            'width': capabilities.width,
+            'height': capabilities.height,
+            'color_scheme': capabilities.color_scheme,
+            'hw_type': 0,  # Default hw_type for CLI tool
+            'rotatebuffer': capabilities.rotatebuffer  # Use device's rotation requirement
+        })
         
         max_upload_retries = max_retries
         base_delay = 2.0
         
         for attempt in range(max_upload_retries):
             try:
-                _LOGGER.debug(f"Upload attempt {attempt + 1}/{max_upload_retries} for {mac_address}")
+                _LOGGER.debug("Upload attempt %d/%d for %s", attempt + 1, max_upload_retries, mac_address)
                 
-                # Create new connection for upload
-                connection = BLEConnection(
-                    mac_address=mac_address,
-                    service_uuid=protocol_handler.service_uuid,
-                    protocol=protocol_handler
-                )
+                if connection.is_connected:
+                    # Reuse the connection the device was interrogated over
+                    upload_context = nullcontext(connection)
+                else:
+                    # Create new connection for upload
+                    upload_context = BLEConnection(
+                        mac_address=mac_address,
+                        service_uuid=protocol_handler.service_uuid,
+                        protocol=protocol_handler
+                    )
                 
-                async with connection:
-                    # Create metadata object for upload
-                    from .ble.metadata import BLEDeviceMetadata
-                    metadata = BLEDeviceMetadata({
-                        'width': capabilities.width,
-                        'height': capabilities.height,
-                        'color_scheme': capabilities.color_scheme,
-                        'hw_type': 0,  # Default hw_type for CLI tool
-                        'rotatebuffer': capabilities.rotatebuffer  # Use device's rotation requirement
-                    })
-                    
+                async with upload_context as upload_connection:
                     # Create uploader and upload image
-                    from .ble.image_upload import BLEImageUploader
-                    uploader = BLEImageUploader(connection, mac_address)
+                    uploader = BLEImageUploader(upload_connection, mac_address)
                     
                     # Use appropriate upload method based on protocol
                     if protocol == 'oepl':
@@ -159,27 +237,27 @@ class DeviceManager:
                         )
                     
                     if success:
-                        _LOGGER.info(f"Image uploaded successfully to {mac_address} on attempt {attempt + 1}")
+                        _LOGGER.info("Image uploaded successfully to %s on attempt %d", mac_address, attempt + 1)
                         return True
                     else:
                         if attempt < max_upload_retries - 1:
                             delay = base_delay * (attempt + 1)
-                            _LOGGER.warning(f"Upload failed, retrying in {delay:.1f}s...")
+                            _LOGGER.warning("Upload failed, retrying in %.1fs...", delay)
                             await asyncio.sleep(delay)
                         else:
-                            _LOGGER.error(f"Image upload failed to {mac_address} after {max_upload_retries} attempts")
+                            _LOGGER.error("Image upload failed to %s after %d attempts", mac_address, max_upload_retries)
                             return False
                         
             except Exception as e:
                 if attempt < max_upload_retries - 1:
                     delay = base_delay * (attempt + 1)
                     _LOGGER.warning(
-                        f"Upload attempt {attempt + 1} failed for {mac_address}: {e}. "
-                        f"Retrying in {delay:.1f}s..."
+                        "Upload attempt %d failed for %s: %s. Retrying in %.1fs...",
+                        attempt + 1, mac_address, e, delay
                     )
                     await asyncio.sleep(delay)
                 else:
-                    _LOGGER.error(f"Upload error for {mac_address} after {max_upload_retries} attempts: {e}")
+                    _LOGGER.error("Upload error for %s after %d attempts: %s", mac_address, max_upload_retries, e)
                     return False
         
         return False
\ No newline at end of file
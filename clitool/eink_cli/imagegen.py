@@ -1,15 +1,58 @@
 """Simplified image generation for CLI tool."""
 
+import asyncio
+import functools
+import hashlib
 import io
+import json
 import logging
-from typing import Dict, Any, Tuple
+import threading
+from typing import Dict, Any, List, Tuple
 from pathlib import Path
 
 from PIL import Image, ImageDraw, ImageFont
-import numpy as np
 
 _LOGGER = logging.getLogger(__name__)
 
+# Rendered images keyed by a hash of everything that affects the output
+IMAGE_CACHE_DIR = Path.home() / ".cache" / "eink_cli" / "images"
+
+# Most recently written images kept in the cache
+IMAGE_CACHE_SIZE = 64
+
+# Bump when rendering changes so images cached by older versions are not reused
+_IMAGE_CACHE_VERSION = 1
+
+# Renders run in worker threads; the shared font faces are not safe to use concurrently
+_RENDER_LOCK = threading.Lock()
+
+# Clockwise display rotations as lossless transposes (PIL's ROTATE_* turn counter-clockwise)
+_ROTATIONS = {
+    90: Image.Transpose.ROTATE_270,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_90,
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _font_data() -> bytes | None:
+    """Read the system text font once, or return None if it isn't installed."""
+    try:
+        # Let PIL resolve the font in its usual search path, then keep the file contents
+        return Path(ImageFont.truetype("DejaVuSans.ttf", 10).path).read_bytes()
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=32)
+def _load_font(size: int) -> ImageFont.ImageFont:
+    """Load the text font at a given size, shared by all generators in the process."""
+    data = _font_data()
+    if data is None:
+        # Fallback to default font
+        return ImageFont.load_default()
+    return ImageFont.truetype(io.BytesIO(data), size)
+
 
 class ImageGenerator:
     """Simplified image generator for eink displays."""
@@ -17,89 +60,146 @@ class ImageGenerator:
     def __init__(self):
         """Initialize image generator."""
         self._default_font = None
-        self._fonts = {}
+        self._palettes = {}
+        self._drawers = {
+            'text': self._draw_text,
+            'rectangle': self._draw_rectangle,
+            'line': self._draw_line,
+        }
     
     async def generate_image(self, config: Dict[str, Any], device_info: Dict[str, Any]) -> bytes:
         """Generate image from configuration.
         
+        Rendering runs in a worker thread, so BLE work on the event loop
+        carries on while the image is drawn and encoded.
+        
         Args:
             config: Configuration dictionary from YAML
             device_info: Device information with dimensions
             
         Returns:
-            JPEG image data as bytes
+            PNG image data as bytes
         """
+        def render() -> bytes:
+            with _RENDER_LOCK:
+                return self._generate_image_sync(config, device_info)
+        
+        return await asyncio.to_thread(render)
+    
+    def _generate_image_sync(self, config: Dict[str, Any], device_info: Dict[str, Any]) -> bytes:
+        """Generate image from configuration on the calling thread."""
         width = device_info['width']
         height = device_info['height']
         color_scheme_int = device_info.get('color_scheme', 0)
         
-        _LOGGER.debug(f"Generating {width}x{height} image for color_scheme={color_scheme_int} display")
+        cache_file = self._cache_file(config, width, height, color_scheme_int)
+        try:
+            image_data = cache_file.read_bytes()
+            _LOGGER.debug("Using cached image %s", cache_file.name)
+            return image_data
+        except OSError:
+            pass
+        
+        _LOGGER.debug("Generating %dx%d image for color_scheme=%s display", width, height, color_scheme_int)
         
         # Get display settings
         display_config = config.get('display', {})
         background = display_config.get('background', 'white')
         rotate = display_config.get('rotate', 0)
         
-        # Create base image
+        # Create base image, paletted with the device's colors
         if rotate in (90, 270):
             # Swap dimensions for rotation
-            img = Image.new('RGB', (height, width), color=self._get_color(background, color_scheme_int))
+            img = Image.new('P', (height, width), color=self._get_color(background, color_scheme_int))
         else:
-            img = Image.new('RGB', (width, height), color=self._get_color(background, color_scheme_int))
+            img = Image.new('P', (width, height), color=self._get_color(background, color_scheme_int))
+        img.putpalette(self._get_palette(color_scheme_int)[0])
         
         draw = ImageDraw.Draw(img)
+        # Anti-aliased glyph edges would blend palette indices rather than colors
+        draw.fontmode = "1"
         
-        # Draw content elements
+        # Draw content elements, resolving each distinct color once per image
         content = config.get('content', [])
+        inks = {}
         for element in content:
             try:
-                await self._draw_element(draw, element, color_scheme_int, img.size)
+                color = element.get('color', 'black')
+                if color not in inks:
+                    inks[color] = self._get_color(color, color_scheme_int)
+                self._draw_element(draw, element, inks[color])
             except Exception as e:
-                _LOGGER.error(f"Error drawing element {element.get('type', 'unknown')}: {e}")
+                _LOGGER.error("Error drawing element %s: %s", element.get('type', 'unknown'), e)
                 continue
         
         # Apply rotation if needed
         if rotate:
-            img = img.rotate(-rotate, expand=True)  # PIL rotates counter-clockwise
+            img = img.transpose(_ROTATIONS[rotate])
         
         # Process image for device (quantize colors and apply dithering)
         from .ble.image_processing import process_image_for_device
         processed_img = process_image_for_device(img, color_scheme_int, dither=2)
         
-        # Convert to JPEG
+        # Encode losslessly; the image only holds a few flat colors, which PNG keeps exact
         img_byte_arr = io.BytesIO()
-        processed_img.save(img_byte_arr, format='JPEG', quality=95)
-        return img_byte_arr.getvalue()
+        processed_img.save(img_byte_arr, format='PNG', compress_level=1)
+        image_data = img_byte_arr.getvalue()
+        self._save_cached(cache_file, image_data)
+        return image_data
+    
+    def _cache_file(self, config: Dict[str, Any], width: int, height: int, color_scheme: int) -> Path:
+        """Get the image cache path for a configuration and display.
+        
+        Only the display and content sections are hashed, so devices showing
+        the same content share a cached image.
+        """
+        key = json.dumps(
+            [_IMAGE_CACHE_VERSION, config.get('display', {}), config.get('content', []),
+             width, height, color_scheme],
+            sort_keys=True, default=str
+        )
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return IMAGE_CACHE_DIR / f"{digest}.png"
+    
+    def _save_cached(self, cache_file: Path, image_data: bytes) -> None:
+        """Store a rendered image, dropping the oldest beyond IMAGE_CACHE_SIZE.
+        
+        Failures are logged and otherwise ignored; the cache is only an optimization.
+        """
+        try:
+            IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix('.tmp')
+            tmp_file.write_bytes(image_data)
+            tmp_file.replace(cache_file)
+            
+            cached = sorted(IMAGE_CACHE_DIR.glob('*.png'), key=lambda path: path.stat().st_mtime)
+            for old_file in cached[:-IMAGE_CACHE_SIZE]:
+                old_file.unlink()
+        except OSError as e:
+            _LOGGER.debug("Could not cache image %s: %s", cache_file.name, e)
     
-    async def _draw_element(self, draw: ImageDraw.Draw, element: Dict[str, Any], 
-                          color_scheme: int, img_size: Tuple[int, int]) -> None:
+    def _draw_element(self, draw: ImageDraw.Draw, element: Dict[str, Any], ink: int) -> None:
         """Draw a single element on the image.
         
         Args:
             draw: PIL ImageDraw object
             element: Element configuration
-            color_scheme: Device color scheme
-            img_size: Image dimensions (width, height)
+            ink: Palette index of the element's color
         """
         element_type = element['type']
         
-        if element_type == 'text':
-            await self._draw_text(draw, element, color_scheme, img_size)
-        elif element_type == 'rectangle':
-            self._draw_rectangle(draw, element, color_scheme)
-        elif element_type == 'line':
-            self._draw_line(draw, element, color_scheme)
-        else:
-            _LOGGER.warning(f"Unknown element type: {element_type}")
+        drawer = self._drawers.get(element_type)
+        if drawer is None:
+            _LOGGER.warning("Unknown element type: %s", element_type)
+            return
+        drawer(draw, element, ink)
     
-    async def _draw_text(self, draw: ImageDraw.Draw, element: Dict[str, Any], 
-                        color_scheme: int, img_size: Tuple[int, int]) -> None:
+    def _draw_text(self, draw: ImageDraw.Draw, element: Dict[str, Any], ink: int) -> None:
         """Draw text element."""
         text = element['text']
         x = element['x']
         y = element['y']
         font_size = element.get('font_size', 16)
-        color = self._get_color(element.get('color', 'black'), color_scheme)
         anchor = element.get('anchor', 'top_left')
         
         # Get font
@@ -109,65 +209,76 @@ class ImageGenerator:
         pil_anchor = self._convert_anchor(anchor)
         
         # Draw text
-        draw.text((x, y), text, fill=color, font=font, anchor=pil_anchor)
+        draw.text((x, y), text, fill=ink, font=font, anchor=pil_anchor)
     
-    def _draw_rectangle(self, draw: ImageDraw.Draw, element: Dict[str, Any], color_scheme: int) -> None:
-        """Draw rectangle element."""
+    def _draw_rectangle(self, draw: ImageDraw.Draw, element: Dict[str, Any], ink: int) -> None:
+        """Draw rectangle element.
+        
+        The ink is already a palette index, so this calls PIL's core drawing
+        object directly and skips ImageDraw.rectangle's per-call ink parsing.
+        """
         x = element['x']
         y = element['y']
         width = element['width']
         height = element['height']
-        color = self._get_color(element.get('color', 'black'), color_scheme)
         filled = element.get('filled', True)
         
-        coords = [x, y, x + width, y + height]
+        coords = (x, y, x + width, y + height)
         
         if filled:
-            draw.rectangle(coords, fill=color)
+            draw.draw.draw_rectangle(coords, ink, 1)
         else:
-            draw.rectangle(coords, outline=color, width=1)
+            draw.draw.draw_rectangle(coords, ink, 0, 1)
     
-    def _draw_line(self, draw: ImageDraw.Draw, element: Dict[str, Any], color_scheme: int) -> None:
+    def _draw_line(self, draw: ImageDraw.Draw, element: Dict[str, Any], ink: int) -> None:
         """Draw line element."""
         x1 = element['x1']
         y1 = element['y1']
         x2 = element['x2']
         y2 = element['y2']
-        color = self._get_color(element.get('color', 'black'), color_scheme)
         width = element.get('width', 1)
         
-        draw.line([(x1, y1), (x2, y2)], fill=color, width=width)
+        draw.line([(x1, y1), (x2, y2)], fill=ink, width=width)
     
-    def _get_color(self, color_name: str, color_scheme: int) -> Tuple[int, int, int]:
-        """Get RGB color tuple for color name and scheme.
+    def _get_palette(self, color_scheme: int) -> Tuple[List[int], Dict[str, int], str]:
+        """Get the PIL palette for a color scheme.
         
         Args:
-            color_name: Color name ('black', 'white', 'red', 'yellow')
-            color_scheme: Device color scheme (0=BW, 1=BWR, 2=BWY)
+            color_scheme: Device color scheme (0=BW, 1=BWR, 2=BWY, ...)
             
         Returns:
-            RGB color tuple
+            Tuple of (flat 768-entry palette, palette index by color name, scheme name)
         """
-        # Basic color mapping
-        colors = {
-            'black': (0, 0, 0),
-            'white': (255, 255, 255),
-            'red': (255, 0, 0),
-            'yellow': (255, 255, 0),
-        }
+        if color_scheme not in self._palettes:
+            from .ble.color_scheme import ColorScheme
+            
+            scheme = ColorScheme.from_int(color_scheme)
+            colors = scheme.palette.colors
+            palette = [channel for rgb in colors.values() for channel in rgb]
+            palette += [0] * (768 - len(palette))
+            indices = {name: index for index, name in enumerate(colors)}
+            self._palettes[color_scheme] = (palette, indices, scheme.name)
+        
+        return self._palettes[color_scheme]
+    
+    def _get_color(self, color_name: str, color_scheme: int) -> int:
+        """Get palette index for color name and scheme.
+        
+        Args:
+            color_name: Color name ('black', 'white', 'red', 'yellow', ...)
+            color_scheme: Device color scheme (0=BW, 1=BWR, 2=BWY, ...)
+            
+        Returns:
+            Index into the color scheme's palette
+        """
+        _, indices, scheme_name = self._get_palette(color_scheme)
         
         # Validate color is supported by scheme
-        if color_scheme == 0 and color_name not in ['black', 'white']:
-            _LOGGER.warning(f"Color '{color_name}' not supported in BW scheme, using black")
-            color_name = 'black'
-        elif color_scheme == 1 and color_name not in ['black', 'white', 'red']:
-            _LOGGER.warning(f"Color '{color_name}' not supported in BWR scheme, using black")
-            color_name = 'black'
-        elif color_scheme == 2 and color_name not in ['black', 'white', 'yellow']:
-            _LOGGER.warning(f"Color '{color_name}' not supported in BWY scheme, using black")
+        if color_name not in indices:
+            _LOGGER.warning("Color '%s' not supported in %s scheme, using black", color_name, scheme_name)
             color_name = 'black'
         
-        return colors.get(color_name, (0, 0, 0))
+        return indices[color_name]
     
     def _get_font(self, size: int) -> ImageFont.ImageFont:
         """Get font for given size.
@@ -178,22 +289,7 @@ class ImageGenerator:
         Returns:
             PIL ImageFont object
         """
-        if size in self._fonts:
-            return self._fonts[size]
-        
-        try:
-            # Try to load a system font
-            font = ImageFont.truetype("DejaVuSans.ttf", size)
-        except OSError:
-            try:
-                # Fallback to default font
-                font = ImageFont.load_default()
-            except Exception:
-                # Last resort - create a basic font
-                font = ImageFont.load_default()
-        
-        self._fonts[size] = font
-        return font
+        return _load_font(size)
     
     def _convert_anchor(self, anchor: str) -> str:
         """Convert anchor name to PIL anchor format.
@@ -3,6 +3,7 @@
 
 import asyncio
 import sys
+import tempfile
 from pathlib import Path
 
 # Add the package to path
@@ -11,6 +12,10 @@ sys.path.insert(0, str(Path(__file__).parent))
 from eink_cli.config import load_config, create_example_config
 from eink_cli.imagegen import ImageGenerator
 
+# Display sizes (width, height) and color schemes (0=BW, 1=BWR, 2=BWY) to render
+TEST_SIZES = [(296, 128), (250, 122), (400, 300)]
+TEST_COLOR_SCHEMES = [0, 1, 2]
+
 
 async def test_config_loading():
     """Test configuration loading."""
@@ -20,26 +25,24 @@ async def test_config_loading():
     example_config = create_example_config()
     print(f"Example config: {example_config}")
     
-    # Test image generation
+    # Test image generation, sharing one generator (and its font and palette caches)
     print("Testing image generation...")
     image_gen = ImageGenerator()
     
-    # Mock device info
-    device_info = {
-        'width': 296,
-        'height': 128,
-        'color_scheme': 'bwr',
-        'protocol': 'test'
-    }
+    # Mock device info, updated for each display
+    device_info = {'protocol': 'test'}
     
     try:
-        image_data = await image_gen.generate_image(example_config, device_info)
-        print(f"Generated image: {len(image_data)} bytes")
+        for width, height in TEST_SIZES:
+            for color_scheme in TEST_COLOR_SCHEMES:
+                device_info.update(width=width, height=height, color_scheme=color_scheme)
+                image_data = await image_gen.generate_image(example_config, device_info)
+                print(f"Generated {width}x{height} color_scheme={color_scheme} image: {len(image_data)} bytes")
         
-        # Save test image
-        with open('test_output.jpg', 'wb') as f:
-            f.write(image_data)
-        print("Test image saved as test_output.jpg")
+        # Save the last test image outside the source tree
+        output_file = Path(tempfile.gettempdir()) / 'eink_test_output.png'
+        output_file.write_bytes(image_data)
+        print(f"Test image saved as {output_file}")
         
     except Exception as e:
         print(f"Error generating image: {e}")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Test BLE connection error handling without a radio."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the package to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bleak.exc import BleakCharacteristicNotFoundError, BleakDBusError, BleakError
+from bleak_retry_connector import BleakNotFoundError
+
+from eink_cli.ble.connection import BLEConnection, _is_fatal_error, _is_stale_cache_error, _is_timeout
+from eink_cli.ble.exceptions import BLEConnectionError
+
+
+class FailingWriteClient:
+    """Stands in for BleakClient, failing every write after a short delay."""
+
+    is_connected = True
+
+    async def write_gatt_char(self, char, data, response=False):
+        await asyncio.sleep(0.01)
+        raise BleakError("write failed: link supervision timeout")
+
+
+class HangingWriteClient:
+    """Stands in for BleakClient, never completing a write."""
+
+    is_connected = True
+
+    async def write_gatt_char(self, char, data, response=False):
+        await asyncio.Event().wait()
+
+
+def _wrapped(cause: Exception) -> BleakNotFoundError:
+    """Re-raise an error the way establish_connection() does and return what it raises."""
+    try:
+        try:
+            raise cause
+        except Exception as exc:
+            raise BleakNotFoundError("CLI-AA:BB:CC:DD:EE:FF: Failed to connect after 2 attempt(s)") from exc
+    except BleakNotFoundError as wrapped:
+        return wrapped
+
+
+def test_fatal_dbus_error_found_when_wrapped():
+    """A NotReady adapter is fatal even after bleak_retry_connector re-raises it."""
+    error = _wrapped(BleakDBusError("org.bluez.Error.NotReady", []))
+    assert _is_fatal_error(error)
+    assert not _is_timeout(error)
+
+
+def test_transient_dbus_error_not_fatal():
+    """Errors retrying can fix are not treated as fatal."""
+    error = _wrapped(BleakDBusError("org.bluez.Error.Failed", ["le-connection-abort-by-local"]))
+    assert not _is_fatal_error(error)
+
+
+def test_timeout_found_when_wrapped():
+    """A connect timeout surfaces as BleakNotFoundError but is still recognized as a timeout."""
+    error = _wrapped(asyncio.TimeoutError())
+    assert _is_timeout(error)
+    assert not _is_fatal_error(error)
+
+
+def test_stale_cache_missing_characteristic():
+    """A characteristic missing from the device invalidates the cache wherever it is hit."""
+    error = BleakCharacteristicNotFoundError(42)
+    assert _is_stale_cache_error(error, using_cached_handles=False, link_up=True)
+
+
+def test_stale_cache_failed_cached_handle_operation():
+    """An error from a cached handle on a live link invalidates the cache, whatever its wording."""
+    error = BleakDBusError("org.bluez.Error.InvalidOffset", [])
+    assert _is_stale_cache_error(error, using_cached_handles=True, link_up=True)
+
+
+def test_stale_cache_not_blamed_for_unrelated_errors():
+    """Errors merely mentioning handles, or raised after the link dropped, keep the cache."""
+    error = BleakError("Failed to connect: no handle for adapter")
+    assert not _is_stale_cache_error(error, using_cached_handles=False, link_up=True)
+    assert not _is_stale_cache_error(BleakError("Not connected"), using_cached_handles=True, link_up=False)
+
+
+def test_read_notification_reports_failed_write():
+    """A pipelined write failure surfaces from read_notification() instead of a timeout."""
+    async def run():
+        connection = BLEConnection("AA:BB:CC:DD:EE:FF", "0000fef0-0000-1000-8000-00805f9b34fb", None)
+        connection.client = FailingWriteClient()
+        connection.write_char = object()
+
+        await connection.write_command(b"\x00\x01")
+        try:
+            await connection.read_notification(timeout=1.0)
+        except BleakError as e:
+            assert "write failed" in str(e)
+        else:
+            raise AssertionError("read_notification() should raise the write error")
+
+    asyncio.run(run())
+
+
+def test_cancelled_write_reported():
+    """A pipelined write cancelled underneath the connection raises a connection error."""
+    async def run():
+        connection = BLEConnection("AA:BB:CC:DD:EE:FF", "0000fef0-0000-1000-8000-00805f9b34fb", None)
+        connection.client = HangingWriteClient()
+        connection.write_char = object()
+
+        await connection.write_command(b"\x00\x01")
+        for task in connection._write_pending:
+            task.cancel()
+        await asyncio.sleep(0)
+
+        try:
+            await connection.write_command(b"\x00\x02")
+        except BLEConnectionError as e:
+            assert "cancelled" in str(e)
+        else:
+            raise AssertionError("write_command() should report the cancelled write")
+        assert not connection._write_pending
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    test_fatal_dbus_error_found_when_wrapped()
+    test_transient_dbus_error_not_fatal()
+    test_timeout_found_when_wrapped()
+    test_stale_cache_missing_characteristic()
+    test_stale_cache_failed_cached_handle_operation()
+    test_stale_cache_not_blamed_for_unrelated_errors()
+    test_read_notification_reports_failed_write()
+    test_cancelled_write_reported()
+    print("✓ Connection error tests passed")
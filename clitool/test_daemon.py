@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Test the daemon's stdin/stdout mode and how clients handle a misbehaving daemon."""
+
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+CLITOOL_DIR = Path(__file__).parent
+
+# A daemon that cannot read its input hangs rather than failing, so bound each run
+RUN_TIMEOUT = 30
+
+sys.path.insert(0, str(CLITOOL_DIR))
+
+from eink_cli.daemon import forward_request
+
+# A status request, a blank line, an unknown command and a ping missing its device
+REQUESTS = b'{"command": "status"}\n\n{"command": "bogus"}\n{"command": "ping"}\n'
+
+
+def _run_stdio_daemon(stdin) -> subprocess.CompletedProcess:
+    """Run 'eink-cli daemon --stdio' with the given stdin until it exits."""
+    return subprocess.run(
+        [sys.executable, '-m', 'eink_cli.cli', 'daemon', '--stdio'],
+        cwd=CLITOOL_DIR,
+        stdin=stdin,
+        capture_output=True,
+        timeout=RUN_TIMEOUT,
+    )
+
+
+def _responses(result: subprocess.CompletedProcess) -> list:
+    """Decode the JSON responses a daemon run wrote to stdout."""
+    assert result.returncode == 0, result.stderr.decode()
+    return [json.loads(line) for line in result.stdout.decode().splitlines()]
+
+
+def _check_responses(responses: list) -> None:
+    """Check the answers to REQUESTS; the blank line gets no response."""
+    assert len(responses) == 3
+    assert responses[0] == {'ok': True}
+    assert responses[1]['ok'] is False and 'bogus' in responses[1]['error']
+    assert responses[2] == {'ok': False, 'error': "ping requires mac_address"}
+
+
+def test_stdin_dev_null():
+    """An empty /dev/null stdin ends the daemon straight away."""
+    with open('/dev/null', 'rb') as stdin:
+        assert _responses(_run_stdio_daemon(stdin)) == []
+
+
+def test_stdin_regular_file():
+    """Requests redirected from a file are answered in order."""
+    with tempfile.TemporaryFile() as stdin:
+        stdin.write(REQUESTS)
+        stdin.seek(0)
+        _check_responses(_responses(_run_stdio_daemon(stdin)))
+
+
+def test_stdin_pipe():
+    """Requests written to a pipe are answered in order."""
+    result = subprocess.run(
+        [sys.executable, '-m', 'eink_cli.cli', 'daemon', '--stdio'],
+        cwd=CLITOOL_DIR,
+        input=REQUESTS,
+        capture_output=True,
+        timeout=RUN_TIMEOUT,
+    )
+    _check_responses(_responses(result))
+
+
+def _forward_to(handler) -> dict:
+    """Forward a status request to a throwaway socket server using the given handler."""
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            socket_path = Path(tmp) / 'daemon.sock'
+            server = await asyncio.start_unix_server(handler, path=str(socket_path))
+            async with server:
+                return await forward_request({'command': 'status', 'timeout': 0.01}, socket_path)
+
+    return asyncio.run(run())
+
+
+def test_forward_daemon_closes_without_reply():
+    """A daemon that hangs up mid-request produces an error response."""
+    async def handler(reader, writer):
+        await reader.readline()
+        writer.close()
+
+    response = _forward_to(handler)
+    assert response['ok'] is False and 'closed' in response['error']
+
+
+def test_forward_invalid_reply():
+    """A reply that is not JSON produces an error response instead of raising."""
+    async def handler(reader, writer):
+        await reader.readline()
+        writer.write(b"not json\n")
+        await writer.drain()
+        writer.close()
+
+    response = _forward_to(handler)
+    assert response['ok'] is False and 'Invalid response' in response['error']
+
+
+if __name__ == '__main__':
+    test_stdin_dev_null()
+    test_stdin_regular_file()
+    test_stdin_pipe()
+    test_forward_daemon_closes_without_reply()
+    test_forward_invalid_reply()
+    print("✓ Daemon stdio tests passed")
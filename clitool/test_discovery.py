@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Test the shared BLE scanner's start/stop bookkeeping without a radio."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the package to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from eink_cli.ble import discovery
+
+
+class FakeScanner:
+    """Stands in for BleakScanner, recording every scanner started and stopped."""
+
+    started = []
+    stopped = []
+    fail_start = False
+
+    def __init__(self, detection_callback=None, scanning_mode=None):
+        self.running = False
+
+    async def start(self):
+        # Yield so concurrent users get a chance to run while the start is in flight
+        await asyncio.sleep(0.01)
+        if FakeScanner.fail_start:
+            raise RuntimeError("adapter not ready")
+        self.running = True
+        FakeScanner.started.append(self)
+
+    async def stop(self):
+        await asyncio.sleep(0.01)
+        self.running = False
+        FakeScanner.stopped.append(self)
+
+
+class FakeDevice:
+    """Stands in for a BLEDevice; only the address is used by the scanner cache."""
+
+    def __init__(self, address):
+        self.address = address
+
+
+def _reset_fake():
+    FakeScanner.started = []
+    FakeScanner.stopped = []
+    FakeScanner.fail_start = False
+    discovery.BleakScanner = FakeScanner
+
+
+def test_concurrent_users_share_one_scanner():
+    """Users entering while the scanner is starting share it, and it is stopped once."""
+    _reset_fake()
+    shared = discovery._SharedScanner()
+
+    async def user():
+        async with shared.scanning():
+            await asyncio.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(*(user() for _ in range(4)))
+
+    asyncio.run(run())
+
+    assert len(FakeScanner.started) == 1, f"started {len(FakeScanner.started)} scanners"
+    assert FakeScanner.stopped == FakeScanner.started
+    assert not any(scanner.running for scanner in FakeScanner.started)
+    assert shared._users == 0
+
+
+def test_failed_start_releases_slot():
+    """A scanner that fails to start leaves no user counted, so the next user starts afresh."""
+    _reset_fake()
+    shared = discovery._SharedScanner()
+
+    async def run():
+        FakeScanner.fail_start = True
+        try:
+            async with shared.scanning():
+                raise AssertionError("scanning() should not yield when the start fails")
+        except RuntimeError:
+            pass
+        assert shared._users == 0
+
+        FakeScanner.fail_start = False
+        async with shared.scanning():
+            assert len(FakeScanner.started) == 1
+
+    asyncio.run(run())
+
+    assert FakeScanner.stopped == FakeScanner.started
+
+
+def test_old_advertisements_evicted():
+    """Advertisements older than ADVERTISEMENT_MAX_AGE are dropped as new ones arrive."""
+    now = [1000.0]
+    real_monotonic = discovery.time.monotonic
+    discovery.time.monotonic = lambda: now[0]
+    try:
+        shared = discovery._SharedScanner()
+        for i in range(100):
+            shared._detection_callback(FakeDevice(f"C0:00:00:00:00:{i:02X}"), None)
+        assert len(shared._seen) == 100
+
+        now[0] += discovery.ADVERTISEMENT_MAX_AGE + 1
+        shared._detection_callback(FakeDevice("AA:BB:CC:DD:EE:FF"), None)
+
+        assert list(shared._seen) == ["AA:BB:CC:DD:EE:FF"]
+        assert shared.get_cached("AA:BB:CC:DD:EE:FF") is not None
+    finally:
+        discovery.time.monotonic = real_monotonic
+
+
+if __name__ == '__main__':
+    test_concurrent_users_share_one_scanner()
+    test_failed_start_releases_slot()
+    test_old_advertisements_evicted()
+    print("✓ Shared scanner tests passed")
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """MQTT Controller for EInk Display Updates with Home Assistant MQTT Discovery."""
 
+import hashlib
 import json
 import logging
 import os
+import re
 import sys
 import time
 import threading
@@ -11,19 +13,47 @@ import threading
 import asyncio
 
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple, Union
 
 import paho.mqtt.client as mqtt
 import yaml
 
+try:
+    # Optional: considerably faster parsing of incoming payloads
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 # Add clitool to path for importing
 sys.path.insert(0, '../clitool')
 from eink_cli.config import load_config
+from eink_cli.daemon import ConnectionPool, DEFAULT_IDLE_TIMEOUT
 from eink_cli.device import DeviceManager
 from eink_cli.imagegen import ImageGenerator
 from eink_cli.ble import get_protocol_by_manufacturer_id, discover_devices
 
 
+# libyaml's C loader is much faster; fall back to the pure-Python one without it
+_YAMLLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Template placeholders look like {name}; any key without braces in it can be used
+PLACEHOLDER_RE = re.compile(r"\{([^{}]+)\}")
+
+
+def _compile_template(template: str) -> List[Tuple[str, Union[bytes, str]]]:
+    """Split a template into ('lit', utf-8 bytes) and ('var', name) parts."""
+    parts = []
+    pos = 0
+    for match in PLACEHOLDER_RE.finditer(template):
+        if match.start() > pos:
+            parts.append(('lit', template[pos:match.start()].encode('utf-8')))
+        parts.append(('var', match.group(1)))
+        pos = match.end()
+    if pos < len(template):
+        parts.append(('lit', template[pos:].encode('utf-8')))
+    return parts
+
+
 def _is_dbus_connection_dead(exc: Exception) -> bool:
     """Check if exception indicates a dead D-Bus connection (unrecoverable)."""
     msg = str(exc)
@@ -42,16 +72,35 @@ class EInkController:
     def __init__(self, settings_file: str = "settings.yaml"):
         """Initialize controller with settings."""
         self.settings = self._load_settings(settings_file)
-        self.template = self._load_template()
+        self._template_parts = self._load_template()
         self.client = None
         self.last_update_time = 0
         self.min_update_interval = 30  # Minimum 30 seconds between updates
+        self._last_config_hash = None  # Hash of the last device config uploaded successfully
         self.max_retries = self.settings.get('device', {}).get('max_retries', 5)
         self.ttl_seconds = self.settings.get('device', {}).get('ttl_seconds', 0)
         
+        # Shared across messages so font, palette and image caches stay warm
+        self.device_manager = DeviceManager()
+        self.image_gen = ImageGenerator()
+        
+        # Device connections kept open between messages, closed after idle_timeout seconds unused
+        self.pool = ConnectionPool(
+            self.device_manager,
+            idle_timeout=self.settings.get('device', {}).get('idle_timeout', DEFAULT_IDLE_TIMEOUT)
+        )
+        
         # BLE lock - prevents battery scan and display update from conflicting
         self.ble_lock = threading.Lock()
         
+        # Event loop for all BLE work, run in its own thread by start()
+        self._loop = None
+        
+        # Latest payload per topic waiting for the worker, so paho's network thread
+        # never blocks on BLE and a burst of messages becomes a single upload
+        self._pending: Dict[str, bytes] = {}
+        self._pending_changed = threading.Condition()
+        
         # HA Discovery settings
         self.discovery_prefix = self.settings.get('homeassistant', {}).get('discovery_prefix', 'homeassistant')
         self.mac_address = self.settings.get('device', {}).get('mac_address', '').upper()
@@ -71,7 +120,7 @@ class EInkController:
         """Load settings from YAML file."""
         try:
             with open(settings_file, 'r') as f:
-                return yaml.safe_load(f)
+                return yaml.load(f, Loader=_YAMLLoader)
         except FileNotFoundError:
             print(f"Settings file {settings_file} not found")
             sys.exit(1)
@@ -79,12 +128,12 @@ class EInkController:
             print(f"Error parsing settings file: {e}")
             sys.exit(1)
     
-    def _load_template(self) -> str:
-        """Load template file as string."""
+    def _load_template(self) -> List[Tuple[str, Union[bytes, str]]]:
+        """Load template file, split into parts for _write_device_config()."""
         template_file = self.settings['files']['template']
         try:
             with open(template_file, 'r') as f:
-                return f.read()
+                return _compile_template(f.read())
         except FileNotFoundError:
             print(f"Template file {template_file} not found")
             sys.exit(1)
@@ -158,55 +207,76 @@ class EInkController:
         
         topic = f"{self.discovery_prefix}/device/{self.device_id}/config"
         self.client.publish(topic, json.dumps(discovery_payload), retain=True)
-        self.logger.info(f"Published HA discovery config to {topic}")
+        self.logger.info("Published HA discovery config to %s", topic)
         
         # Mark device as online
         self.client.publish(self.availability_topic, "online", retain=True)
     
-    def _replace_placeholders(self, template: str, data: Dict[str, Any]) -> str:
-        """Replace placeholders in template with data values."""
-        result = template
-        for key, value in data.items():
-            placeholder = f"{{{key}}}"
-            result = result.replace(placeholder, str(value))
-        return result
-    
-    def _write_device_config(self, config_content: str) -> str:
-        """Write device configuration to file."""
+    def _write_device_config(self, data: Dict[str, Any]) -> Tuple[str, bytes]:
+        """Fill the template's placeholders with data values and write the device configuration.
+        
+        Literal template text is already encoded, so only the values are encoded
+        per message, and parts go straight to the file without joining them first.
+        Placeholders without a matching data key are left as they are. The file is
+        written beside the output and renamed over it, so readers never see it half-written.
+        
+        Returns:
+            Tuple of (output file path, BLAKE2b digest of its contents)
+        """
         output_file = self.settings['files']['output']
-        with open(output_file, 'w') as f:
-            f.write(config_content)
-        self.logger.info(f"Generated device config: {output_file}")
-        return output_file
+        tmp_file = f"{output_file}.tmp"
+        digest = hashlib.blake2b(digest_size=16)
+        encoded = {}  # Values encoded so far, for placeholders used more than once
+        with open(tmp_file, 'wb') as f:
+            for kind, value in self._template_parts:
+                if kind == 'lit':
+                    chunk = value
+                elif value in encoded:
+                    chunk = encoded[value]
+                else:
+                    text = str(data[value]) if value in data else f"{{{value}}}"
+                    chunk = encoded[value] = text.encode('utf-8')
+                f.write(chunk)
+                digest.update(chunk)
+        os.replace(tmp_file, output_file)
+        self.logger.info("Generated device config: %s", output_file)
+        return output_file, digest.digest()
     
     async def _send_to_device(self, config_file: str) -> bool:
         """Send configuration to device using CLI modules with retry."""
         try:
-            self.logger.info(f"Loading config: {config_file}")
+            self.logger.info("Loading config: %s", config_file)
             config = load_config(Path(config_file))
             
             mac_address = config['device']['mac_address']
             protocol = config['device'].get('protocol', 'auto')
             
-            self.logger.info(f"Connecting to device {mac_address}...")
+            self.logger.info("Connecting to device %s...", mac_address)
             
-            device_manager = DeviceManager()
-            device_info = await device_manager.connect_device(
-                mac_address, 
-                protocol=protocol if protocol != 'auto' else None,
-                timeout=60
-            )
-            
-            self.logger.info(f"Connected to {device_info['name']} ({device_info['protocol']})")
-            
-            # Generate image
-            self.logger.info("Generating image...")
-            image_gen = ImageGenerator()
-            image_data = await image_gen.generate_image(config, device_info)
-            
-            # Upload image with retries
-            self.logger.info(f"Uploading image with retry (max {self.max_retries} attempts)...")
-            success = await device_manager.upload_image(image_data, device_info, max_retries=self.max_retries, ttl_seconds=self.ttl_seconds)
+            # Reuses the connection and device info from the previous message while it is still up
+            async with self.pool.lock(mac_address):
+                device_info = await self.pool.acquire(
+                    mac_address, 
+                    protocol=protocol if protocol != 'auto' else None,
+                    timeout=60
+                )
+                self.logger.info("Connected to %s (%s)", device_info['name'], device_info['protocol'])
+                
+                # Generate image
+                self.logger.info("Generating image...")
+                image_data = await self.image_gen.generate_image(config, device_info)
+                
+                # Upload image with retries
+                self.logger.info("Uploading image with retry (max %d attempts)...", self.max_retries)
+                try:
+                    success = await self.device_manager.upload_image(image_data, device_info, max_retries=self.max_retries, ttl_seconds=self.ttl_seconds)
+                except BaseException:
+                    await self.pool.release(mac_address)
+                    raise
+                
+                if not success:
+                    # Reconnect on the next message rather than reuse a connection in an unknown state
+                    await self.pool.release(mac_address)
             
             if success:
                 self.logger.info("Successfully sent to device")
@@ -216,93 +286,136 @@ class EInkController:
                 return False
                 
         except Exception as e:
-            self.logger.error(f"Error sending to device: {e}")
+            self.logger.error("Error sending to device: %s", e)
             if _is_dbus_connection_dead(e):
                 self.logger.critical("D-Bus connection lost, exiting for systemd restart")
                 os._exit(1)
             return False
     
-    def _on_connect(self, client, userdata, flags, rc):
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
         """Callback for MQTT connection."""
-        if rc == 0:
+        if not reason_code.is_failure:
             self.logger.info("Connected to MQTT broker")
             
             # Subscribe to HA status topic for re-discovery on HA restart
             ha_status_topic = f"{self.discovery_prefix}/status"
             client.subscribe(ha_status_topic)
-            self.logger.info(f"Subscribed to HA status: {ha_status_topic}")
+            self.logger.info("Subscribed to HA status: %s", ha_status_topic)
             
-            # Subscribe to data update topic
+            # Subscribe to data update topic, shared between controllers in a group if configured
             topic = self.settings['mqtt']['topic']
+            shared = self.settings['mqtt'].get('shared')
+            if shared:
+                group = shared if isinstance(shared, str) else "einkgroup"
+                topic = f"$share/{group}/{topic}"
             client.subscribe(topic)
-            self.logger.info(f"Subscribed to data topic: {topic}")
+            self.logger.info("Subscribed to data topic: %s", topic)
             
             # Subscribe to refresh button command topic
             client.subscribe(self.command_topic)
-            self.logger.info(f"Subscribed to command topic: {self.command_topic}")
+            self.logger.info("Subscribed to command topic: %s", self.command_topic)
             
             # Publish discovery
             self._publish_ha_discovery()
         else:
-            self.logger.error(f"Failed to connect to MQTT broker: {rc}")
+            self.logger.error("Failed to connect to MQTT broker: %s", reason_code)
     
     def _on_message(self, client, userdata, msg):
-        """Callback for MQTT message received."""
+        """Callback for MQTT message received.
+        
+        Runs on paho's network thread, so display updates are only recorded here
+        and carried out by _process_messages(). A message replaces any update
+        still pending for the same topic.
+        """
         try:
             topic = msg.topic
-            payload = msg.payload.decode('utf-8')
-            self.logger.info(f"Received message on {topic}: {payload}")
+            # Kept as bytes; the JSON parser reads them directly
+            payload = msg.payload
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info("Received message on %s: %s", topic, payload.decode('utf-8', errors='replace'))
             
             # Handle HA birth message - re-publish discovery
             ha_status_topic = f"{self.discovery_prefix}/status"
-            if topic == ha_status_topic and payload == "online":
+            if topic == ha_status_topic and payload == b"online":
                 self.logger.info("Home Assistant came online, re-publishing discovery")
                 self._publish_ha_discovery()
                 return
             
-            # Handle refresh button press
-            if topic == self.command_topic:
-                self.logger.info("Refresh button pressed, triggering display update")
-                threading.Thread(target=self._run_async_send, args=(self.settings['files']['output'],)).start()
-                return
-            
-            # Handle data update message
-            current_time = time.time()
-            if current_time - self.last_update_time < self.min_update_interval:
-                remaining = self.min_update_interval - (current_time - self.last_update_time)
-                self.logger.info(f"Skipping update, cooldown active ({remaining:.1f}s remaining)")
-                return
-            
-            # Parse JSON payload
-            try:
-                data = json.loads(payload)
-            except json.JSONDecodeError:
-                self.logger.error("Invalid JSON in message payload")
-                return
-            
-            self.last_update_time = current_time
-            
-            # Replace placeholders in template
-            config_content = self._replace_placeholders(self.template, data)
-            
-            # Write device configuration
-            config_file = self._write_device_config(config_content)
-            
-            # Send to device in a thread
-            threading.Thread(target=self._run_async_send, args=(config_file,)).start()
+            with self._pending_changed:
+                if topic in self._pending:
+                    self.logger.info("Superseding pending update on %s", topic)
+                self._pending[topic] = payload
+                self._pending_changed.notify()
                 
         except Exception as e:
-            self.logger.error(f"Error processing message: {e}")
+            self.logger.error("Error processing message: %s", e)
+    
+    def _process_messages(self):
+        """Carry out pending display updates one at a time, forever."""
+        while True:
+            with self._pending_changed:
+                while not self._pending:
+                    self._pending_changed.wait()
+                pending, self._pending = self._pending, {}
+            
+            for topic, payload in pending.items():
+                try:
+                    self._handle_update(topic, payload)
+                except Exception as e:
+                    self.logger.error("Error processing message: %s", e)
+    
+    def _handle_update(self, topic: str, payload: bytes):
+        """Update the display for a refresh command or data message."""
+        # Handle refresh button press
+        if topic == self.command_topic:
+            self.logger.info("Refresh button pressed, triggering display update")
+            self._run_async_send(self.settings['files']['output'])
+            return
+        
+        # Handle data update message
+        current_time = time.time()
+        if current_time - self.last_update_time < self.min_update_interval:
+            remaining = self.min_update_interval - (current_time - self.last_update_time)
+            self.logger.info("Skipping update, cooldown active (%.1fs remaining)", remaining)
+            return
+        
+        # Parse JSON payload
+        try:
+            data = json_loads(payload)
+        except ValueError:
+            self.logger.error("Invalid JSON in message payload")
+            return
+        
+        # Write device configuration from the template
+        config_file, config_hash = self._write_device_config(data)
+        
+        # The display already shows exactly this; don't redraw it
+        if config_hash == self._last_config_hash:
+            self.logger.info("Device config unchanged since last upload, skipping update")
+            return
+        
+        self.last_update_time = current_time
+        
+        if self._run_async_send(config_file):
+            self._last_config_hash = config_hash
+
+    def _run_coroutine(self, coro):
+        """Run a coroutine on the controller's event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
 
-    def _run_async_send(self, config_file):
-        """Helper to bridge thread to async without blocking MQTT."""
+    async def _reap_idle(self):
+        """Periodically close device connections left unused past the idle timeout."""
+        interval = max(1.0, min(self.pool.idle_timeout / 2, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            await self.pool.close_idle()
+
+    def _run_async_send(self, config_file) -> bool:
+        """Send a configuration to the device, waiting for any battery scan to finish."""
         with self.ble_lock:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(self._send_to_device(config_file))
-            loop.close()
+            return self._run_coroutine(self._send_to_device(config_file))
 
-    def _on_disconnect(self, client, userdata, rc):
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
         """Callback for MQTT disconnection."""
         self.logger.info("Disconnected from MQTT broker")
 
@@ -316,7 +429,7 @@ class EInkController:
         max_retries = 3
         initial_backoff = 20  # seconds
 
-        self.logger.info(f"Battery publisher started: interval={interval}s")
+        self.logger.info("Battery publisher started: interval=%ss", interval)
 
         while True:
             success = False
@@ -325,9 +438,9 @@ class EInkController:
                     self.logger.info("BLE busy (display update in progress), skipping battery scan")
                     break
                 try:
-                    loop = asyncio.new_event_loop()
-                    devices = loop.run_until_complete(discover_devices(timeout=10))
-                    loop.close()
+                    # A connected device stops advertising, so drop any pooled connection first
+                    self._run_coroutine(self.pool.close_all())
+                    devices = self._run_coroutine(discover_devices(timeout=10))
 
                     for device in devices:
                         if self.mac_address and device['mac_address'] != self.mac_address:
@@ -346,12 +459,14 @@ class EInkController:
                             })
                             if self.client:
                                 self.client.publish(self.state_topic, state_payload, retain=True)
-                                self.logger.info(f"Published state: {adv.battery_pct}% ({adv.battery_mv}mV) {adv.temperature}°C")
+                                self.logger.info(
+                                    "Published state: %s%% (%smV) %s°C", adv.battery_pct, adv.battery_mv, adv.temperature
+                                )
                             success = True
                             break
 
                 except Exception as e:
-                    self.logger.error(f"Battery scan error: {e}")
+                    self.logger.error("Battery scan error: %s", e)
                     if _is_dbus_connection_dead(e):
                         self.logger.critical("D-Bus connection lost, exiting for systemd restart")
                         os._exit(1)
@@ -362,11 +477,11 @@ class EInkController:
                     break
 
                 backoff = initial_backoff * (2 ** attempt)
-                self.logger.warning(f"Device not found, retry {attempt + 1}/{max_retries} in {backoff}s")
+                self.logger.warning("Device not found, retry %d/%d in %ss", attempt + 1, max_retries, backoff)
                 time.sleep(backoff)
 
             if not success:
-                self.logger.warning(f"Battery scan failed after {max_retries} attempts, will retry next interval")
+                self.logger.warning("Battery scan failed after %d attempts, will retry next interval", max_retries)
 
             time.sleep(interval)
     
@@ -374,8 +489,13 @@ class EInkController:
         """Start the MQTT controller."""
         mqtt_config = self.settings['mqtt']
         
+        # One long-lived loop rather than one per message, so BLE state carries over
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="ble-loop", daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._reap_idle(), self._loop)
+        
         # Create MQTT client
-        self.client = mqtt.Client()
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, protocol=mqtt.MQTTv5)
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
         self.client.on_disconnect = self._on_disconnect
@@ -391,7 +511,7 @@ class EInkController:
             )
         
         try:
-            self.logger.info(f"Connecting to MQTT broker: {mqtt_config['broker']}:{mqtt_config['port']}")
+            self.logger.info("Connecting to MQTT broker: %s:%s", mqtt_config['broker'], mqtt_config['port'])
             self.client.connect(
                 mqtt_config['broker'], 
                 mqtt_config['port'], 
@@ -402,17 +522,21 @@ class EInkController:
             battery_thread = threading.Thread(target=self._battery_publish_loop, daemon=True)
             battery_thread.start()
 
-            # Start loop
+            # Network traffic runs on paho's thread; this one handles display updates
             self.logger.info("Starting MQTT controller...")
-            self.client.loop_forever()
+            self.client.loop_start()
+            self._process_messages()
             
         except KeyboardInterrupt:
             self.logger.info("Shutting down...")
             if self.client:
                 self.client.publish(self.availability_topic, "offline", retain=True)
                 self.client.disconnect()
+                self.client.loop_stop()
+            self._run_coroutine(self.pool.close_all())
+            self._loop.call_soon_threadsafe(self._loop.stop)
         except Exception as e:
-            self.logger.error(f"Error starting controller: {e}")
+            self.logger.error("Error starting controller: %s", e)
             sys.exit(1)
 
 
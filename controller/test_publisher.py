@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 """Test MQTT publisher for controller testing."""
 
+import argparse
 import json
 import sys
 from datetime import datetime
 
 import paho.mqtt.client as mqtt
+import paho.mqtt.publish as publish
 import yaml
 
 
@@ -19,13 +21,9 @@ def load_settings():
         sys.exit(1)
 
 
-def publish_test_message():
-    """Publish test message to MQTT broker."""
-    settings = load_settings()
-    mqtt_config = settings['mqtt']
-    
-    # Test message payload
-    test_payload = {
+def make_test_payload():
+    """Build a test message payload."""
+    return {
         "belle_battery": "85",
         "weather_condition": "Partly Cloudy", 
         "temperature": "22",
@@ -33,9 +31,46 @@ def publish_test_message():
         "recycling_days": "10",
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
+
+
+def publish_test_messages(count):
+    """Publish several test messages over a single broker connection."""
+    settings = load_settings()
+    mqtt_config = settings['mqtt']
+    topic = mqtt_config['topic']
+    
+    msgs = [{"topic": topic, "payload": json.dumps(make_test_payload())} for _ in range(count)]
+    
+    auth = None
+    if mqtt_config.get('username') and mqtt_config.get('password'):
+        auth = {"username": mqtt_config['username'], "password": mqtt_config['password']}
+    
+    try:
+        print(f"Publishing {count} messages to {topic} on {mqtt_config['broker']}:{mqtt_config['port']}")
+        publish.multiple(
+            msgs,
+            hostname=mqtt_config['broker'],
+            port=mqtt_config['port'],
+            auth=auth,
+            protocol=mqtt.MQTTv5
+        )
+        print(f"✓ {count} messages published successfully")
+        
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+def publish_test_message():
+    """Publish test message to MQTT broker."""
+    settings = load_settings()
+    mqtt_config = settings['mqtt']
+    
+    # Test message payload
+    test_payload = make_test_payload()
     
     # Create MQTT client
-    client = mqtt.Client()
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
     
     # Set credentials if provided
     if mqtt_config.get('username') and mqtt_config.get('password'):
@@ -67,4 +102,11 @@ def publish_test_message():
 
 
 if __name__ == '__main__':
-    publish_test_message()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=1, help="Number of messages to publish")
+    args = parser.parse_args()
+    
+    if args.count > 1:
+        publish_test_messages(args.count)
+    else:
+        publish_test_message()
\ No newline at end of file
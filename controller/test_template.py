@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Test template placeholder substitution in the MQTT controller."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Make the controller and the CLI package importable from any working directory
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'clitool'))
+
+import yaml
+
+from mqtt_controller import EInkController
+
+
+def _render(template: str, data: dict) -> str:
+    """Write a device config from a template through the controller and return it."""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        (tmp_dir / 'template.yaml').write_text(template, encoding='utf-8')
+        settings = {
+            'mqtt': {'broker': 'localhost', 'port': 1883, 'topic': 'eink/display/update'},
+            'files': {
+                'template': str(tmp_dir / 'template.yaml'),
+                'output': str(tmp_dir / 'device.yaml'),
+            },
+        }
+        (tmp_dir / 'settings.yaml').write_text(yaml.safe_dump(settings), encoding='utf-8')
+
+        controller = EInkController(str(tmp_dir / 'settings.yaml'))
+        output_file, _ = controller._write_device_config(data)
+        return Path(output_file).read_text(encoding='utf-8')
+
+
+def test_word_keys():
+    """Plain keys are substituted and unknown placeholders are left as they are."""
+    rendered = _render("text: {title} / {missing}\n", {'title': "Hello"})
+    assert rendered == "text: Hello / {missing}\n"
+
+
+def test_non_word_keys():
+    """Keys with dashes, dots or spaces are substituted like any other key."""
+    rendered = _render(
+        "a: {weather-condition}\nb: {sensor.temp}\nc: {bin day}\n",
+        {'weather-condition': "Cloudy", 'sensor.temp': 21, 'bin day': "Tue"}
+    )
+    assert rendered == "a: Cloudy\nb: 21\nc: Tue\n"
+
+
+def test_values_not_substituted_again():
+    """A value containing a placeholder is written literally."""
+    rendered = _render("{a} {b}\n", {'a': "{b}", 'b': "x"})
+    assert rendered == "{b} x\n"
+
+
+if __name__ == '__main__':
+    test_word_keys()
+    test_non_word_keys()
+    test_values_not_substituted_again()
+    print("✓ Template tests passed")